@@ -0,0 +1,153 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+sys.path[:0] = [os.path.join(os.path.dirname(os.path.abspath(__file__)), folder) for folder in ("../Sender", "../Receiver")]
+
+import SenderSender
+import ReceiverReceiver
+from GenerateScouts import generateExports
+
+def measure(results: Dict[str, Dict[str, Any]], stage: str, func: Callable[[], Any]) -> Any:
+    """Times a stage and tracks its peak memory. The scripts print a lot, so that gets thrown away while timing."""
+    tracemalloc.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results[stage] = { "seconds": round(elapsed, 6), "peak_memory_bytes": peak }
+    print(f"{stage:>28}: {elapsed * 1000:10.2f} ms :: peak {peak / 1024:10.1f} KiB")
+    return value
+
+def runBenchmarks(exports: List[Dict[str, Any]], encoding: str, workdir: str) -> Dict[str, Any]:
+    stages: Dict[str, Dict[str, Any]] = {}
+    sizes: Dict[str, int] = {}
+
+    watcher = SenderSender.BackgroundADBWatcher(
+        client=None, # type: ignore
+        export_path="",
+        cache_path=os.path.join(workdir, "scouting_cache.json"),
+        encoding=encoding,
+        dictionary_path=os.path.join(workdir, "scouting_dictionary.bin"),
+    )
+    def ingestAll():
+        for idx, export in enumerate(exports):
+            watcher.ingestExport(f"device_{idx + 1}", export)
+
+    # Sender: queueing up the scouts from every export, then again when none of them changed
+    measure(stages, "sender_ingest", ingestAll)
+    measure(stages, "sender_ingest_unchanged", ingestAll)
+
+    # Sender: merging everything into saved_scouts.json, then doing it again (after a wipe) when it's all duplicates
+    measure(stages, "sender_save", watcher.saveToDisk)
+    watcher.wipe()
+    ingestAll()
+    measure(stages, "sender_save_duplicates", watcher.saveToDisk)
+
+    # Sender: what `send` does before anything touches the serial port
+    combined, _ = measure(stages, "sender_send_merge", watcher._mergeUnsentScouts)
+    json_payload = measure(stages, "encode_json", lambda: json.dumps(combined, separators=(',', ':')).encode('utf-8'))
+    binary_payload = measure(stages, "encode_binary", lambda: SenderSender.encodeScoutingData(combined))
+    measure(stages, "train_dictionary", watcher.trainDictionary)
+    payload = watcher._encodePayload(combined)
+    compressed_payload = measure(stages, "compress", lambda: SenderSender.compressPayload(payload, watcher.dictionary))
+    frames = measure(stages, "build_frames", lambda: SenderSender._buildDataFrames(compressed_payload, 1, 1))
+    digest_payload = measure(stages, "build_digest", lambda: SenderSender.encodeDigest(SenderSender.buildDigest(combined), combined["template"], 1))
+    compressed_digest = SenderSender.compressPayload(digest_payload, watcher.dictionary)
+
+    sizes.update({
+        "json_payload_bytes": len(json_payload),
+        "binary_payload_bytes": len(binary_payload),
+        "compressed_payload_bytes": len(compressed_payload),
+        "frames": len(frames),
+        "wire_bytes": sum(len(frame) for frame in frames),
+        "digest_bytes": len(digest_payload),
+        "compressed_digest_bytes": len(compressed_digest),
+    })
+
+    # Receiver: decoding the transfer and storing it
+    dictionaries = { SenderSender.dictionaryId(watcher.dictionary): watcher.dictionary } if watcher.dictionary else {}
+    decoded = measure(stages, "receiver_decode", lambda: ReceiverReceiver.decodeScoutingPayload(compressed_payload, dictionaries))
+    store = ReceiverReceiver.CombinedScoutStore(
+        json_path=os.path.join(workdir, "combined_scouts.json"),
+        csv_path=os.path.join(workdir, "combined_scouts.csv"),
+        journal_path=os.path.join(workdir, "combined_scouts.journal.jsonl"),
+        index_path=os.path.join(workdir, "combined_scouts.index.json"),
+        summary_path=os.path.join(workdir, "combined_scouts.summary.json"),
+        lock_path=os.path.join(workdir, "combined_scouts.lock"),
+        export_interval=3600,
+    )
+    digest = ReceiverReceiver.decodeScoutingPayload(compressed_digest, dictionaries)["digest"]
+    measure(stages, "receiver_ingest_digest", lambda: store.addDigest(1, digest))
+    measure(stages, "receiver_ingest", lambda: store.add(decoded, (1, 1)))
+    measure(stages, "receiver_export", store.export)
+    measure(stages, "receiver_ingest_duplicates", lambda: store.add(decoded))
+
+    # A single match update once the whole event is already stored, this should stay flat as events get bigger
+    team, scouts = next(iter(decoded["teams"].items()))
+    single_match = { "teams": { team: [{ **scouts[0], "benchmark": True }] }, "template": decoded["template"] }
+    measure(stages, "receiver_ingest_single_match", lambda: store.add(single_match)) # type: ignore
+    measure(stages, "receiver_query_all_teams", store.query)
+    store.close()
+
+    # Receiver: importing saved_scouts.json (like off of a USB stick) into an empty store, then writing the exports once
+    import_dir = os.path.join(workdir, "import")
+    os.makedirs(import_dir)
+    import_store = ReceiverReceiver.CombinedScoutStore(*(os.path.join(import_dir, name) for name in ("combined_scouts.json", "combined_scouts.csv", "combined_scouts.journal.jsonl", "combined_scouts.index.json", "combined_scouts.summary.json", "combined_scouts.lock")), export_interval=3600)
+    measure(stages, "receiver_bulk_import", lambda: ReceiverReceiver.importFiles([watcher.saved_path], import_store))
+    measure(stages, "receiver_bulk_import_export", import_store.close)
+
+    return { "stages": stages, "sizes": sizes }
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the merge, encode and ingest stages of the scouting pipeline.")
+    parser.add_argument("--input-dir", type=str, default=None, help="Use exports from GenerateScouts.py instead of generating them")
+    parser.add_argument("--teams", type=int, default=60)
+    parser.add_argument("--matches", type=int, default=12)
+    parser.add_argument("--metrics", type=int, default=22)
+    parser.add_argument("--devices", type=int, default=6)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=3284)
+    parser.add_argument("--encoding", type=str, choices=["json", "binary"], default="binary")
+    parser.add_argument("--output", type=str, default="./benchmark_results.json")
+    args = parser.parse_args()
+
+    if args.input_dir is not None:
+        exports = []
+        for path in sorted(glob.glob(os.path.join(args.input_dir, "*.json"))):
+            with open(path, "r") as f:
+                exports.append(json.load(f))
+        dataset: Dict[str, Any] = { "input_dir": args.input_dir }
+    else:
+        exports = generateExports(args.teams, args.matches, args.metrics, args.devices, args.duplicate_rate, args.seed)
+        dataset = { "teams": args.teams, "matches": args.matches, "metrics": args.metrics, "devices": args.devices, "duplicate_rate": args.duplicate_rate, "seed": args.seed }
+    dataset["scouts"] = sum(len(scouts) for export in exports for scouts in export["teams"].values())
+    print(f"Benchmarking {dataset['scouts']} scouts across {len(exports)} device(s)...")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = runBenchmarks(exports, args.encoding, workdir)
+
+    results = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "encoding": args.encoding,
+        "dataset": dataset,
+        **results,
+    }
+    with open(args.output, "w+") as f:
+        json.dump(results, f, indent=4)
+    print(f"Wrote results to {args.output}")
+
+if __name__ == "__main__":
+    main()
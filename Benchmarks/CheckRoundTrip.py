@@ -0,0 +1,128 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+sys.path[:0] = [os.path.join(os.path.dirname(os.path.abspath(__file__)), folder) for folder in ("../Sender", "../Receiver")]
+
+import SenderSender
+import ReceiverReceiver
+from GenerateScouts import generateExports
+
+def combineExports(exports: List[Dict[str, Any]], workdir: str) -> Dict[str, Any]:
+    """What `send` would put together from the exports, before it gets encoded."""
+    watcher = SenderSender.BackgroundADBWatcher(
+        client=None, # type: ignore
+        export_path="",
+        cache_path=os.path.join(workdir, "scouting_cache.json"),
+        dictionary_path=os.path.join(workdir, "scouting_dictionary.bin"),
+    )
+    for idx, export in enumerate(exports):
+        watcher.ingestExport(f"device_{idx + 1}", export)
+    combined, _ = watcher._mergeUnsentScouts()
+    return json.loads(json.dumps(combined))
+
+def checkBinaryCodec(combined: Dict[str, Any]):
+    """The binary payload (compressed or not) has to decode back into exactly what the JSON payload would."""
+    # The odd values the generator never makes, in a metric that isn't in the template
+    edge_cases = { "3284": [{ "unlisted": value } for value in (None, -7, 2 ** 40, 1.5, "ünïcode", "", [1500, 2300], [], True)] }
+    for data in (combined, { "teams": edge_cases, "template": {} }, { "teams": {}, "template": combined["template"] }):
+        expected = json.loads(json.dumps(data))
+        payload = SenderSender.encodeScoutingData(data)
+        assert ReceiverReceiver.decodeScoutingPayload(payload) == expected, "binary payload didn't round trip"
+
+        dictionary = SenderSender.trainDictionary([payload])
+        dictionaries = { SenderSender.dictionaryId(dictionary): dictionary }
+        for compressed in (SenderSender.compressPayload(payload), SenderSender.compressPayload(payload, dictionary)):
+            assert ReceiverReceiver.decodeScoutingPayload(compressed, dictionaries) == expected, "compressed payload didn't round trip"
+
+        json_payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        assert ReceiverReceiver.decodeScoutingPayload(SenderSender.compressPayload(json_payload)) == expected, "compressed JSON didn't round trip"
+    print("Binary codec and compression: OK")
+
+def checkEscaping(rng: random.Random):
+    """Escaped bytes never contain the EOF marker (or a NUL) and always unescape back to the original."""
+    samples = [bytes(range(256)), SenderSender._SCOUTING_EOF * 3, b"\xFE\x01\xFE\x02\xFE\x03", *(rng.randbytes(rng.randint(0, 300)) for _ in range(200))]
+    for data in samples:
+        escaped = SenderSender._escapeWireBytes(data)
+        assert SenderSender._SCOUTING_EOF not in escaped and b"\x00" not in escaped, "escaped bytes still have an EOF/NUL in them"
+        assert ReceiverReceiver._unescapeWireBytes(escaped) == data, "escaping didn't round trip"
+    print("Wire escaping: OK")
+
+def feedStream(reassembler: ReceiverReceiver.TransferReassembler, stream: bytes, rng: random.Random, send_control) -> List[Any]:
+    """Feeds a serial byte stream through the splitter/reassembler in randomly sized reads, like `SerialReader` does."""
+    splitter = ReceiverReceiver.SegmentSplitter()
+    completed = []
+    offset = 0
+    while offset < len(stream):
+        read_size = rng.randint(1, 200)
+        for segment in splitter.feed(stream[offset:offset + read_size]):
+            transfer = reassembler.handleSegment(segment, send_control)
+            if transfer is not None:
+                completed.append(transfer)
+        offset += read_size
+    return completed
+
+def checkReassembly(payload: bytes, rng: random.Random):
+    """Frames that come in split across reads, out of order, duplicated, corrupted or from two stations at once still
+    reassemble into the original payloads, and missing frames get NACKed."""
+    controls: List[Any] = []
+    def sendControl(frame: bytes):
+        controls.append(ReceiverReceiver._parseFrame(frame[:-len(ReceiverReceiver._SCOUTING_PACKET_EOF)]))
+
+    frames = SenderSender._buildDataFrames(payload, 0x1234, 42)
+    assert all(len(frame) <= SenderSender._MAX_FRAME_SIZE and frame.count(SenderSender._SCOUTING_EOF) == 1 for frame in frames), "frame doesn't fit in a packet"
+
+    # Reordered, with duplicates and a corrupted copy of a frame thrown in
+    shuffled = frames + rng.sample(frames, min(3, len(frames)))
+    rng.shuffle(shuffled)
+    corrupted = bytearray(frames[0])
+    corrupted[len(corrupted) // 2] ^= 0x01
+    shuffled.insert(rng.randrange(len(shuffled)), bytes(corrupted))
+    reassembler = ReceiverReceiver.TransferReassembler(sendControl, nack_timeout=0.0)
+    completed = feedStream(reassembler, b"".join(shuffled), rng, sendControl)
+    assert completed == [(0x1234, 42, payload)], "reordered frames didn't reassemble"
+    assert controls[-1][:3] == (ReceiverReceiver._FRAME_ACK, 0x1234, 42), "completed transfer wasn't ACKed"
+
+    # Two stations using the same transfer ID on the same channel, one of them missing a frame until it's NACKed
+    other_payload = payload[::-1]
+    other_frames = SenderSender._buildDataFrames(other_payload, 0x4321, 42)
+    missing = rng.randrange(len(other_frames))
+    interleaved = [frame for pair in zip(frames, other_frames) for frame in pair] + frames[len(other_frames):] + other_frames[len(frames):]
+    interleaved.remove(other_frames[missing])
+    controls.clear()
+    reassembler = ReceiverReceiver.TransferReassembler(sendControl, nack_timeout=0.0)
+    completed = feedStream(reassembler, b"".join(interleaved), rng, sendControl)
+    assert completed == [(0x1234, 42, payload)], "interleaved station didn't reassemble"
+
+    reassembler.poll()
+    nack = controls[-1]
+    assert nack[:3] == (ReceiverReceiver._FRAME_NACK, 0x4321, 42) and nack[5] == missing.to_bytes(2, "big"), "missing frame wasn't NACKed"
+    completed = feedStream(reassembler, other_frames[missing], rng, sendControl)
+    assert completed == [(0x4321, 42, other_payload)], "NACKed frame didn't complete the transfer"
+    print("Framing and reassembly: OK")
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that payloads survive the sender -> receiver round trip unchanged.")
+    parser.add_argument("--teams", type=int, default=24)
+    parser.add_argument("--matches", type=int, default=4)
+    parser.add_argument("--metrics", type=int, default=22)
+    parser.add_argument("--devices", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=3284)
+    args = parser.parse_args()
+
+    exports = generateExports(args.teams, args.matches, args.metrics, args.devices, 0.1, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            combined = combineExports(exports, workdir)
+        checkBinaryCodec(combined)
+        rng = random.Random(args.seed)
+        checkEscaping(rng)
+        checkReassembly(SenderSender.compressPayload(SenderSender.encodeScoutingData(combined)), rng)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+sys.path[:0] = [os.path.join(os.path.dirname(os.path.abspath(__file__)), folder) for folder in ("../Sender", "../Receiver")]
+
+import SenderSender
+import ReceiverReceiver
+from CheckRoundTrip import combineExports
+from GenerateScouts import generateExports
+
+def openStore(workdir: str, **kwargs) -> ReceiverReceiver.CombinedScoutStore:
+    return ReceiverReceiver.CombinedScoutStore(*(os.path.join(workdir, name) for name in ("combined_scouts.json", "combined_scouts.csv", "combined_scouts.journal.jsonl", "combined_scouts.index.json", "combined_scouts.summary.json", "combined_scouts.lock")), export_interval=3600, **kwargs)
+
+def crash(store: ReceiverReceiver.CombinedScoutStore):
+    """Stops a store the way a crash (or Ctrl+C) would: no export, whatever made it into the journal is all there is."""
+    store._stop_event.set()
+    store.export_thread.join()
+    store.journal.close()
+    store.lock_file.close() # type: ignore
+
+def storedScouts(store: ReceiverReceiver.CombinedScoutStore) -> List[Tuple[str, str]]:
+    return sorted((team, json.dumps(scout, sort_keys=True)) for team, scouts in store.combined_scouts["teams"].items() for scout in scouts)
+
+def fileHashes(workdir: str) -> Dict[str, str]:
+    hashes = {}
+    for name in sorted(os.listdir(workdir)):
+        with open(os.path.join(workdir, name), "rb") as f:
+            hashes[name] = hashlib.md5(f.read()).hexdigest()
+    return hashes
+
+def splitBatches(combined: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    """Splits the combined scouts up into `count` messages, like separate sends would."""
+    batches: List[Dict[str, Any]] = [{ "teams": {}, "template": combined["template"] } for _ in range(count)]
+    entries = [(team, scout) for team, scouts in combined["teams"].items() for scout in scouts]
+    for idx, (team, scout) in enumerate(entries):
+        batches[idx % count]["teams"].setdefault(team, []).append(scout)
+    return batches
+
+def checkJournalRecovery(combined: Dict[str, Any], workdir: str):
+    """Scouts survive crashes before, during and after an export, and a read-only store sees them without touching a file."""
+    batches = splitBatches(combined, 4)
+    journal_path = os.path.join(workdir, "combined_scouts.journal.jsonl")
+    expected: List[Tuple[str, str]] = []
+    def expect(batch: Dict[str, Any]):
+        expected.extend((team, json.dumps(scout, sort_keys=True)) for team, scouts in batch["teams"].items() for scout in scouts)
+        expected.sort()
+
+    # Crash after an export, with more scouts in the journal and a half written line at the end of it
+    store = openStore(workdir)
+    store.add(batches[0])
+    expect(batches[0])
+    store.export()
+    store.add(batches[1])
+    expect(batches[1])
+    crash(store)
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"team": "3284", "sco')
+    store = openStore(workdir)
+    assert storedScouts(store) == expected, "journal wasn't replayed after a crash"
+
+    # Only one store can write at a time, but a read-only one can look at everything without changing anything
+    try:
+        openStore(workdir)
+        raise AssertionError("a second store opened while the first one held the lock")
+    except Exception as err:
+        assert "locked" in str(err), err
+    before = fileHashes(workdir)
+    assert storedScouts(openStore(workdir, read_only=True)) == expected, "read-only store didn't replay the journal"
+    assert fileHashes(workdir) == before, "read-only store changed a file"
+
+    # Crash in the middle of an export (the journal was rotated but the snapshot never got written), then again with
+    # more scouts in a fresh journal next to the rotated one
+    store.add(batches[2])
+    expect(batches[2])
+    crash(store)
+    os.replace(journal_path, journal_path + ".old")
+    store = openStore(workdir)
+    assert storedScouts(store) == expected, "rotated journal wasn't replayed"
+    store.add(batches[3])
+    expect(batches[3])
+    crash(store)
+    store = openStore(workdir)
+    assert storedScouts(store) == expected, "rotated and fresh journal weren't both replayed"
+
+    # A clean export folds everything into the snapshot and the journals go away
+    store.close()
+    assert not os.path.exists(journal_path + ".old") and os.path.getsize(journal_path) == 0, "journal wasn't folded into the snapshot"
+    store = openStore(workdir)
+    assert storedScouts(store) == expected, "snapshot is missing scouts"
+    assert sum(store.add(batch) for batch in batches) == 0, "stored scouts got added again"
+    store.close()
+
+def checkDigests(combined: Dict[str, Any], workdir: str):
+    """Digests stay pending until their full scouts come in or get superseded, and that survives a crash."""
+    digest = ReceiverReceiver.decodeScoutingPayload(SenderSender.encodeDigest(SenderSender.buildDigest(combined), combined["template"], 7))["digest"]
+    superseding = ReceiverReceiver.decodeScoutingPayload(SenderSender.encodeDigest(SenderSender.buildDigest(combined), combined["template"], 9, superseded=[8]))["digest"]
+    team = next(iter(combined["teams"]))
+
+    store = openStore(workdir)
+    assert store.addDigest(1, digest) and store.addDigest(1, { **digest, "details": 8 }), "digest wasn't kept"
+    assert "pending" in store.query([team])[team], "digest isn't pending"
+    store.add(combined, (1, 7))
+    store.addDigest(1, superseding)
+    crash(store)
+
+    store = openStore(workdir)
+    assert sorted(store.combined_scouts["digests"]) == ["0001:0009"], "resolved/superseded digests are still pending"
+    assert not store.addDigest(1, digest), "late digest for scouts that already came in was kept"
+    store.close()
+
+def checkImportDedup(combined: Dict[str, Any], workdir: str):
+    """Overlapping exports only import each scout once, no matter how the stopwatches were written down."""
+    first = { "teams": {team: scouts[:len(scouts) // 2 + 1] for team, scouts in combined["teams"].items()}, "template": combined["template"] }
+    second = { "teams": {team: scouts[len(scouts) // 2:] for team, scouts in combined["teams"].items()}, "template": combined["template"] }
+    # Stopwatches come out of saved_scouts.json as lists, they have to dedup against the strings that came over the radio
+    second = json.loads(json.dumps(second))
+    for scouts in second["teams"].values():
+        for scout in scouts:
+            for metric_id, value in scout.items():
+                if isinstance(value, str) and ReceiverReceiver._STOPWATCH_PATTERN.match(value) and "," in value:
+                    scout[metric_id] = [int(lap) if lap.isdigit() else float(lap) for lap in value.split(",")]
+
+    paths = []
+    for idx, export in enumerate((first, second)):
+        paths.append(os.path.join(workdir, f"station_{idx + 1}.json"))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            json.dump(export, f)
+
+    store = openStore(workdir)
+    scouts = [entry for path in paths for entry in ReceiverReceiver.loadImportFile(path)[1]]
+    total = sum(len(team_scouts) for team_scouts in combined["teams"].values())
+    assert store.importScouts(combined["template"], scouts) == total, "overlapping exports didn't dedup"
+    assert store.add(combined) == 0, "imported scouts didn't dedup against the radio's"
+    store.close()
+
+def checkWatermarks(exports: List[Dict[str, Any]], workdir: str):
+    """Pulling the same export again queues nothing, only new or edited scouts get queued."""
+    watcher = SenderSender.BackgroundADBWatcher(
+        client=None, # type: ignore
+        export_path="",
+        cache_path=os.path.join(workdir, "scouting_cache.json"),
+        dictionary_path=os.path.join(workdir, "scouting_dictionary.bin"),
+    )
+    export = copy.deepcopy(exports[0])
+    # Every pull is freshly parsed JSON, so the watcher never gets handed the same objects twice
+    assert watcher.ingestExport("device_1", copy.deepcopy(export)) > 0, "first pull didn't queue anything"
+    assert watcher.ingestExport("device_1", copy.deepcopy(export)) == 0, "pulling the same export queued scouts again"
+
+    team, scouts = next(iter(export["teams"].items()))
+    newer = copy.deepcopy(scouts[-1])
+    newer["timestamp"] = max(scout["timestamp"] for scout in scouts) + 1000
+    scouts.append(newer)
+    edited = next(iter(scouts[0]["metrics"].values()))
+    edited["value"] = "edited" if isinstance(edited["value"], str) else 9999
+    assert watcher.ingestExport("device_1", copy.deepcopy(export)) == 2, "new/edited scouts weren't the only ones queued"
+    watcher.transport.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that scouts survive crashes, imports, digests and repeated pulls without getting lost or duplicated.")
+    parser.add_argument("--teams", type=int, default=24)
+    parser.add_argument("--matches", type=int, default=4)
+    parser.add_argument("--metrics", type=int, default=22)
+    parser.add_argument("--devices", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=3284)
+    args = parser.parse_args()
+
+    exports = generateExports(args.teams, args.matches, args.metrics, args.devices, 0.1, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            combined = combineExports(exports, workdir)
+
+    checks = [
+        ("Journal replay and crash recovery", lambda workdir: checkJournalRecovery(combined, workdir)),
+        ("Digest resolve and supersede", lambda workdir: checkDigests(combined, workdir)),
+        ("Import dedup", lambda workdir: checkImportDedup(combined, workdir)),
+        ("Export watermarks", lambda workdir: checkWatermarks(exports, workdir)),
+    ]
+    for name, check in checks:
+        # Every check gets its own folder, the stores print a lot while they replay/export
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                check(workdir)
+        print(f"{name}: OK")
+
+if __name__ == "__main__":
+    main()
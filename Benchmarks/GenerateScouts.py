@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import random
+import string
+from typing import Any, Dict, List
+
+# Robot Scouter metric types, cycled through so every generated template has a bit of everything
+_METRIC_TYPES = ["number", "boolean", "text", "selector", "stopwatch"]
+_SELECTOR_OPTIONS = ["Ground", "Not Hanging", "Low Rung", "Mid Rung", "High Rung", "Traversal"]
+_SCOUTER_NAMES = ["Keaton", "Dylan", "Owen", "Ava", "Maya", "Eli", "Nora", "Sam"]
+
+def generateTemplate(metric_count: int, rng: random.Random) -> List[Dict[str, str]]:
+    """Makes a metric template with Robot Scouter style (20 character) metric IDs."""
+    alphabet = string.ascii_letters + string.digits
+    return [{
+        "id": "".join(rng.choice(alphabet) for _ in range(20)),
+        "type": _METRIC_TYPES[idx % len(_METRIC_TYPES)],
+        "name": f"Metric {idx + 1}",
+    } for idx in range(metric_count)]
+
+def generateValue(metric_type: str, match: int, rng: random.Random) -> Any:
+    if metric_type == "number":
+        return rng.randint(0, 12)
+    if metric_type == "boolean":
+        return rng.random() < 0.6
+    if metric_type == "text":
+        return rng.choice(_SCOUTER_NAMES) if rng.random() < 0.5 else f"Quals {match}"
+    if metric_type == "selector":
+        return rng.choice(_SELECTOR_OPTIONS)
+    # Stopwatches are a list of lap times in milliseconds
+    return [rng.randint(1500, 30000) for _ in range(rng.randint(0, 3))]
+
+def generateScout(template: List[Dict[str, str]], match: int, timestamp: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "name": None,
+        "timestamp": timestamp,
+        "metrics": {
+            metric["id"]: {
+                "type": metric["type"],
+                "name": metric["name"],
+                "value": generateValue(metric["type"], match, rng),
+                "category": None,
+            } for metric in template
+        },
+    }
+
+def generateExports(team_count: int, matches: int, metric_count: int, device_count: int, duplicate_rate: float, seed: int = 3284) -> List[Dict[str, Any]]:
+    """Generates one Robot Scouter export per device, shaped like `Examples/ExampleScout.json`.
+
+    Every scout lands on one device, and `duplicate_rate` of them also get copied onto a second device (like when two
+    scouters sync the same match).
+    """
+    rng = random.Random(seed)
+    template = generateTemplate(metric_count, rng)
+    teams = sorted(rng.sample(range(1, 9999), team_count))
+    exports: List[Dict[str, Any]] = [{"teams": {}} for _ in range(device_count)]
+
+    timestamp = 1664328568510
+    scout_idx = 0
+    for match in range(1, matches + 1):
+        for team in teams:
+            timestamp += rng.randint(5000, 60000)
+            scout = generateScout(template, match, timestamp, rng)
+
+            device = scout_idx % device_count
+            exports[device]["teams"].setdefault(str(team), []).append(scout)
+            if device_count > 1 and rng.random() < duplicate_rate:
+                duplicate_device = (device + rng.randint(1, device_count - 1)) % device_count
+                exports[duplicate_device]["teams"].setdefault(str(team), []).append(json.loads(json.dumps(scout)))
+            scout_idx += 1
+
+    return exports
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates event sized Robot Scouter exports for benchmarking/testing.")
+    parser.add_argument("--teams", type=int, default=60)
+    parser.add_argument("--matches", type=int, default=12, help="Matches scouted per team")
+    parser.add_argument("--metrics", type=int, default=22)
+    parser.add_argument("--devices", type=int, default=6)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=3284)
+    parser.add_argument("--output-dir", type=str, default="./generated_scouts")
+    args = parser.parse_args()
+
+    exports = generateExports(args.teams, args.matches, args.metrics, args.devices, args.duplicate_rate, args.seed)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for idx, export in enumerate(exports):
+        path = os.path.join(args.output_dir, f"device_{idx + 1}.json")
+        with open(path, "w+") as f:
+            json.dump(export, f, indent=2)
+        print(f"Wrote {sum(len(scouts) for scouts in export['teams'].values())} scouts to {path}")
+
+if __name__ == "__main__":
+    main()
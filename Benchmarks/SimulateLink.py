@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import tty
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path[:0] = [os.path.join(os.path.dirname(os.path.abspath(__file__)), folder) for folder in ("../Sender", "../Receiver")]
+
+import serial
+import SenderSender
+import ReceiverReceiver
+from GenerateScouts import generateExports
+
+class SimulatedLink:
+    """Stands in for the two LoRa32u4 boards (and the air between them) using a pair of ptys.
+
+    `SenderSender.py` talks to one pty and `ReceiverReceiver.py` talks to the other. In between, the link is modeled the
+    same way `Sender.ino`/`Receiver.ino` behave: serial transfer time at the configured baud rate, 128 byte packets,
+    LoRa airtime for the spreading factor, the 500ms delay after every packet and random packet loss.
+
+    Every link is its own channel, so more than one of them can be used to stand in for more than one pair of radios.
+    """
+
+    def __init__(self, baud: int = 9600, spreading_factor: int = 7, loss: float = 0.0, packet_delay: float = 0.5, time_scale: float = 1.0, seed: int = 3284):
+        self.baud = baud
+        self.spreading_factor = spreading_factor
+        self.loss = loss
+        self.packet_delay = packet_delay
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+
+        self.sender_master, self.sender_port = self._openPty()
+        self.receiver_master, self.receiver_port = self._openPty()
+        self.radio_lock = threading.Lock()
+
+        self.stats = { "packets_sent": 0, "packets_lost": 0, "bytes_on_air": 0, "airtime_seconds": 0.0, "control_packets": 0 }
+
+    @staticmethod
+    def _openPty():
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        return master, os.ttyname(slave)
+
+    def _sleep(self, seconds: float):
+        time.sleep(seconds * self.time_scale)
+
+    def _transmit(self, packet: bytes, destination: int, control: bool = False):
+        """Puts a single packet on the air, it may or may not make it to the other side."""
+        airtime = SenderSender.estimateAirtime(len(packet), self.spreading_factor)
+        # The radio is half duplex, only one packet can be in the air at a time
+        with self.radio_lock:
+            self._sleep(airtime)
+            self.stats["packets_sent"] += 1
+            self.stats["control_packets"] += int(control)
+            self.stats["bytes_on_air"] += len(packet)
+            self.stats["airtime_seconds"] += airtime
+            if self.rng.random() < self.loss:
+                self.stats["packets_lost"] += 1
+                return
+        os.write(destination, packet)
+
+    def _senderRadio(self):
+        """Does what `Sender.ino` does with the bytes `SenderSender.py` writes to it."""
+        data = b""
+        # When the serial line is done with everything written so far, it keeps going while the radio is busy
+        serial_done = 0.0
+        while True:
+            chunk = os.read(self.sender_master, 4096)
+            # Serial transfer time from the laptop to the board (10 bits per byte)
+            serial_done = max(serial_done, time.monotonic()) + len(chunk) * 10 / self.baud * self.time_scale
+            data += chunk
+            # One frame per packet, with a credit handed back as soon as it's on the air
+            while SenderSender._SCOUTING_EOF in data or len(data) >= 128:
+                eof_idx = data.find(SenderSender._SCOUTING_EOF)
+                packet_length = min(eof_idx + len(SenderSender._SCOUTING_EOF), 128) if eof_idx >= 0 else 128
+                packet, data = data[:packet_length], data[packet_length:]
+                # Close enough, this waits on the whole read rather than just this packet's part of it
+                time.sleep(max(0.0, serial_done - time.monotonic()))
+                self._transmit(packet, self.receiver_master)
+                os.write(self.sender_master, SenderSender._SCOUTING_EOF)
+                self._sleep(self.packet_delay)
+
+    def _receiverRadio(self):
+        """Does what `Receiver.ino` does with the control frames `ReceiverReceiver.py` writes to it."""
+        splitter = ReceiverReceiver.SegmentSplitter()
+        while True:
+            for segment in splitter.feed(os.read(self.receiver_master, 4096)):
+                self._transmit(segment + ReceiverReceiver._SCOUTING_PACKET_EOF, self.sender_master, control=True)
+
+    def start(self):
+        threading.Thread(target=self._senderRadio, daemon=True).start()
+        threading.Thread(target=self._receiverRadio, daemon=True).start()
+
+def simulate(exports: List[Dict[str, Any]], links: List[SimulatedLink], encoding: str, workdir: str, dictionary: Optional[bytes] = None, timeout: float = 600.0, window: int = 4, digests: bool = True) -> Dict[str, Any]:
+    """Sends the exports through `sendViaSerial` (over every link at once) and waits for the receiver to store them."""
+    link = links[0]
+    watcher = SenderSender.BackgroundADBWatcher(
+        client=None, # type: ignore
+        export_path="",
+        cache_path=os.path.join(workdir, "scouting_cache.json"),
+        encoding=encoding,
+        dictionary_path=os.path.join(workdir, "scouting_dictionary.bin"),
+        serial_ports=[link.sender_port for link in links],
+        baud=link.baud,
+        window=window,
+        digests=digests,
+    )
+    watcher.dictionary = dictionary
+    for idx, export in enumerate(exports):
+        watcher.ingestExport(f"device_{idx + 1}", export)
+
+    # The same pieces `ReceiverReceiver.main` puts together, minus the port detection
+    store = ReceiverReceiver.CombinedScoutStore(
+        json_path=os.path.join(workdir, "combined_scouts.json"),
+        csv_path=os.path.join(workdir, "combined_scouts.csv"),
+        journal_path=os.path.join(workdir, "combined_scouts.journal.jsonl"),
+        index_path=os.path.join(workdir, "combined_scouts.index.json"),
+        summary_path=os.path.join(workdir, "combined_scouts.summary.json"),
+        lock_path=os.path.join(workdir, "combined_scouts.lock"),
+        export_interval=3600,
+    )
+    dictionaries = { SenderSender.dictionaryId(dictionary): dictionary } if dictionary else {}
+    payloads: "queue.Queue[Tuple[int, int, bytes]]" = queue.Queue()
+    reassembler = ReceiverReceiver.TransferReassembler(lambda frame: None, nack_timeout=2.0 * link.time_scale, check_payload=lambda payload: ReceiverReceiver.decodeScoutingPayload(payload, dictionaries))
+    for receiver_link in links:
+        receiver_device = serial.Serial(receiver_link.receiver_port, receiver_link.baud, timeout=0.25)
+        ReceiverReceiver.SerialReader(receiver_device, reassembler, payloads).start()
+
+    start = time.perf_counter()
+    sent = watcher.sendViaSerial()
+    send_finished = time.perf_counter()
+
+    stored = 0
+    payload_size = 0
+    digest_size = 0
+    digest_at: Optional[float] = None
+    while sent:
+        # The digest (if there is one) comes in first, then the full scouts
+        station_id, transfer_id, payload = payloads.get(timeout=timeout)
+        data = ReceiverReceiver.decodeScoutingPayload(payload, dictionaries)
+        if "digest" in data:
+            store.addDigest(station_id, data["digest"])
+            digest_size = len(payload)
+            digest_at = time.perf_counter()
+            continue
+        payload_size = len(payload)
+        stored = store.add(data, (station_id, transfer_id)) # type: ignore
+        break
+    stored_at = time.perf_counter()
+    store.close()
+    # Let the full scouts finish up in the background before the ports go away
+    watcher.transport.waiters.shutdown(wait=True)
+    watcher.transport.close()
+
+    # Everything above ran `time_scale` times faster than real time, so scale it back
+    latency = (stored_at - start) / link.time_scale
+    return {
+        "acknowledged": sent,
+        "scouts_stored": stored,
+        "payload_bytes": payload_size,
+        "latency_seconds": round(latency, 3),
+        "sender_blocked_seconds": round((send_finished - start) / link.time_scale, 3),
+        "digest_bytes": digest_size,
+        "digest_latency_seconds": round((digest_at - start) / link.time_scale, 3) if digest_at is not None else None,
+        "effective_bytes_per_second": round(payload_size / latency, 1) if latency > 0 else 0.0,
+        "scouts_per_minute": round(stored / latency * 60, 1) if latency > 0 else 0.0,
+        "radios": len(links),
+        **{ stat: sum(link.stats[stat] for link in links) for stat in link.stats },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sends generated scouting data through a simulated LoRa link and reports latency/throughput.")
+    parser.add_argument("--teams", type=int, default=6, help="Teams in the send, the default is about one match worth of data")
+    parser.add_argument("--matches", type=int, default=1)
+    parser.add_argument("--metrics", type=int, default=22)
+    parser.add_argument("--devices", type=int, default=6)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=3284)
+    parser.add_argument("--encoding", type=str, choices=["json", "binary"], default="binary")
+    parser.add_argument("--dictionary", type=str, default=None, help="Compression dictionary from `train-dictionary`")
+
+    parser.add_argument("--radios", type=int, default=1, help="Pairs of radios, each one on its own channel")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--window", type=int, default=4, help="Frames the sender can have outstanding on the LoRa sender")
+    parser.add_argument("--no-digests", action="store_true", default=False, help="Send the full scouts without a digest first")
+    parser.add_argument("--spreading-factor", type=int, default=7)
+    parser.add_argument("--loss", type=float, default=0.0, help="Chance of any single packet getting lost")
+    parser.add_argument("--packet-delay", type=float, default=0.5, help="Delay after every packet, from Sender.ino")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Run faster than real time (e.g. 0.1), results are scaled back")
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    exports = generateExports(args.teams, args.matches, args.metrics, args.devices, args.duplicate_rate, args.seed)
+    dictionary = None
+    if args.dictionary is not None:
+        with open(args.dictionary, "rb") as f:
+            dictionary = f.read()
+
+    links = [SimulatedLink(args.baud, args.spreading_factor, args.loss, args.packet_delay, args.time_scale, args.seed + idx) for idx in range(args.radios)]
+    for link in links:
+        link.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        results = simulate(exports, links, args.encoding, workdir, dictionary, window=args.window, digests=not args.no_digests)
+
+    print(f"\n{'Acknowledged':>28}: {results['acknowledged']}")
+    print(f"{'Scouts stored':>28}: {results['scouts_stored']}")
+    print(f"{'Payload':>28}: {results['payload_bytes']} bytes")
+    print(f"{'Packets (lost/control)':>28}: {results['packets_sent']} ({results['packets_lost']}/{results['control_packets']})")
+    print(f"{'Airtime':>28}: {results['airtime_seconds']:.2f} s")
+    if results['digest_latency_seconds'] is not None:
+        print(f"{'Digest':>28}: {results['digest_bytes']} bytes in {results['digest_latency_seconds']:.2f} s")
+    print(f"{'Latency':>28}: {results['latency_seconds']:.2f} s")
+    print(f"{'Effective throughput':>28}: {results['effective_bytes_per_second']:.1f} bytes/s")
+
+    if args.output is not None:
+        with open(args.output, "w+") as f:
+            json.dump({ "settings": vars(args), "results": results }, f, indent=4)
+
+if __name__ == "__main__":
+    main()
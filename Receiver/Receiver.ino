@@ -12,6 +12,8 @@
 #define BAND    915E6
 #define PABOOST true 
 
+String data = "";
+String serialEOF = "\xFF\x32\x84\xFF";
 
 void setup() {
   Serial.begin(9600);
@@ -31,7 +33,24 @@ void setup() {
 }
 
 void loop() {
+  // Control frames (ACK/NACK) from the host get sent back to the sender, one LoRa packet per frame
+  while(Serial.available()) {
+    data += ((char)Serial.read());
+  }
+
+  int eofIdx = data.indexOf(serialEOF);
+  if(eofIdx != -1) {
+    LoRa.beginPacket();
+    for(int i = 0; i < eofIdx + serialEOF.length(); i++) {
+      LoRa.write(data.charAt(i));
+    }
+    LoRa.endPacket();
 
+    data = data.substring(eofIdx + serialEOF.length());
+
+    // Go back to listening for the sender
+    LoRa.receive();
+  }
 }
 
 void onReceive(int packetSize) {
@@ -1,7 +1,15 @@
 import argparse
+import array
+import binascii
+import contextlib
+import glob
 import hashlib
 import json
-from typing import Dict, List, Union
+import math
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 import serial
 import serial.tools.list_ports
 import traceback
@@ -9,85 +17,1150 @@ import signal
 import time
 import os
 import csv
+import queue
+import struct
 import sys
+import threading
+import zlib
 
-_SCOUTING_PACKET_EOF = b"\x00\xFF\x32\x84\xFF\x00"
+_SCOUTING_PACKET_EOF = b"\xFF\x32\x84\xFF"
 _COMBINED_SCOUTING_JSON = "./combined_scouts.json"
 _COMBINED_SCOUTING_CSV = "./combined_scouts.csv"
+_SCOUTING_DICTIONARY = "./scouting_dictionary.bin"
+# Digests of every scout in combined_scouts.json, so incoming scouts don't have to be checked against every stored one
+_COMBINED_SCOUTING_INDEX = "./combined_scouts.index.json"
+# New scouts get appended here and folded into combined_scouts.json whenever the exports get rebuilt
+_COMBINED_SCOUTING_JOURNAL = "./combined_scouts.journal.jsonl"
+# Per-team averages/maxima/stopwatch stats, rewritten along with the other exports
+_COMBINED_SCOUTING_SUMMARY = "./combined_scouts.summary.json"
+# Held by whichever receiver (or import) is writing to the files above, only one of them can at a time
+_COMBINED_SCOUTING_LOCK = "./combined_scouts.lock"
+# Stopwatches show up as comma separated lap times in milliseconds (the sender stringifies the lists)
+_STOPWATCH_PATTERN = re.compile(r"^\d+(?:\.\d+)?(?:,\d+(?:\.\d+)?)*$")
 
-def handleScoutingData(data: Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]]):
-    print(f"Received new scout data...")
-    combined_scouts: Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]] = {"teams": {}}
-    if os.path.exists(_COMBINED_SCOUTING_JSON):
-        with open(_COMBINED_SCOUTING_JSON, "r+") as f:
-            combined_scouts = json.load(f)
+# These have to match up with the binary codec in `SenderSender.py`
+_BINARY_PAYLOAD_MAGIC = 0xB5
+_BINARY_PAYLOAD_VERSION = 1
+# Per-team digests the sender sends ahead of the full scouts (see `encodeDigest` in `SenderSender.py`)
+_DIGEST_PAYLOAD_MAGIC = 0xD6
+_DIGEST_PAYLOAD_VERSION = 1
+
+_COLUMN_BOOL = 0
+_COLUMN_UINT = 1
+_COLUMN_SINT = 2
+_COLUMN_STRING = 3
+_COLUMN_ANY = 4
+_COLUMN_UNLISTED = 0x80
+
+_VALUE_NULL = 0
+_VALUE_FALSE = 1
+_VALUE_TRUE = 2
+_VALUE_INT = 3
+_VALUE_FLOAT = 4
+_VALUE_STRING = 5
+_VALUE_LIST = 6
+
+# These have to match up with the compression in `SenderSender.py`
+_COMPRESSED_PAYLOAD_MAGIC = 0xC7
+_DICTIONARY_ID = struct.Struct(">I")
+
+# These have to match up with the framing in `SenderSender.py`
+# Frames got a station ID after 0xA5, the magic changed so older frames get dropped instead of misread
+_FRAME_MAGIC = 0xA6
+_FRAME_DATA = 0x01
+_FRAME_NACK = 0x02
+_FRAME_ACK = 0x03
+_FRAME_HEADER = struct.Struct(">BBHHHH")
+_FRAME_CRC = struct.Struct(">H")
+_MAX_FRAME_SIZE = 128
+# How many missing sequence numbers fit into a single NACK frame
+_MAX_NACK_ENTRIES = (_MAX_FRAME_SIZE - len(_SCOUTING_PACKET_EOF) - 2 * (_FRAME_HEADER.size + _FRAME_CRC.size)) // 4
+
+def _escapeWireBytes(data: bytes) -> bytes:
+    """Escapes 0xFE, 0xFF and 0x00 so a frame can never contain the EOF marker (or a NUL for the Arduino strings)."""
+    return data.replace(b"\xFE", b"\xFE\x01").replace(b"\xFF", b"\xFE\x02").replace(b"\x00", b"\xFE\x03")
+
+def _unescapeWireBytes(data: bytes) -> bytes:
+    """Reverses `_escapeWireBytes`. 0xFE is only ever sent as an escape, so the order here is safe."""
+    return data.replace(b"\xFE\x02", b"\xFF").replace(b"\xFE\x03", b"\x00").replace(b"\xFE\x01", b"\xFE")
+
+def _buildFrame(frame_type: int, station_id: int, transfer_id: int, sequence: int, total: int, body: bytes = b"") -> bytes:
+    frame = _FRAME_HEADER.pack(_FRAME_MAGIC, frame_type, station_id, transfer_id, sequence, total) + body
+    return _escapeWireBytes(frame + _FRAME_CRC.pack(binascii.crc_hqx(frame, 0xFFFF))) + _SCOUTING_PACKET_EOF
+
+def _parseFrame(segment: bytes) -> Optional[Tuple[int, int, int, int, int, bytes]]:
+    """Parses one EOF-terminated segment (minus the EOF) into (type, station ID, transfer ID, sequence, total, body).
+
+    Anything in front of the frame magic is skipped. Returns None if there isn't a frame in the segment or if the CRC
+    doesn't match.
+    """
+    start = segment.find(bytes([_FRAME_MAGIC]))
+    if start < 0:
+        return None
+    frame = _unescapeWireBytes(segment[start:])
+    if len(frame) < _FRAME_HEADER.size + _FRAME_CRC.size:
+        return None
+    (crc,) = _FRAME_CRC.unpack(frame[-_FRAME_CRC.size:])
+    if binascii.crc_hqx(frame[:-_FRAME_CRC.size], 0xFFFF) != crc:
+        return None
+    _, frame_type, station_id, transfer_id, sequence, total = _FRAME_HEADER.unpack(frame[:_FRAME_HEADER.size])
+    return frame_type, station_id, transfer_id, sequence, total, frame[_FRAME_HEADER.size:-_FRAME_CRC.size]
+
+class StageStats:
+    """Thread-safe timings/counters for each stage of the pipeline, optionally written out to a metrics JSON file."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Union[int, float]] = {}
+        self._stop_event = threading.Event()
+        self.writer: Optional[threading.Thread] = None
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            timing = self.stages.setdefault(stage, { "count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0 })
+            timing["count"] += 1
+            timing["total_seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+            timing["last_seconds"] = seconds
+
+    @contextlib.contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def increment(self, counter: str, amount: int = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def gauge(self, name: str, value: Union[int, float]):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "stages": {
+                    stage: {
+                        "count": int(timing["count"]),
+                        "total_seconds": round(timing["total_seconds"], 6),
+                        "mean_seconds": round(timing["total_seconds"] / timing["count"], 6),
+                        "max_seconds": round(timing["max_seconds"], 6),
+                        "last_seconds": round(timing["last_seconds"], 6),
+                    } for stage, timing in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def write(self, path: str):
+        # Write to a temporary file first so anything watching the metrics file never reads half of it
+        with open(path + ".tmp", "w+") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    def startWriting(self, path: str, interval: float = 10.0):
+        """Rewrites the metrics file every `interval` seconds until `stopWriting` is called."""
+        def writeLoop():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.write(path)
+                except OSError:
+                    traceback.print_exc()
+            self.write(path)
+
+        self.writer = threading.Thread(target=writeLoop, daemon=True)
+        self.writer.start()
+
+    def stopWriting(self):
+        self._stop_event.set()
+        if self.writer is not None:
+            self.writer.join(timeout=5)
+
+# Shared by every thread in here
+_stats = StageStats()
+
+class TransferReassembler:
+    """Keeps partially received transfers around and asks the sender for only the frames that are missing.
+
+    `send_control` is called with fully built control frames (ACK/NACK) that need to go back out over serial. Frames can
+    come in over more than one radio, so this is safe to share between serial readers. Transfers are kept apart by
+    station, so several scouting stations can send at the same time without messing up each other's transfers.
+    """
+
+    def __init__(self, send_control: Callable[[bytes], None], nack_timeout: float = 2.0, expiry: float = 300.0, check_payload: Optional[Callable[[bytes], Any]] = None):
+        self.send_control = send_control
+        # Gets every completed payload before it's ACKed, a transfer that raises (say, compressed with a dictionary that
+        # hasn't been loaded) never gets ACKed so the sender keeps its scouts as unsent instead of losing them
+        self.check_payload = check_payload
+        self.nack_timeout = nack_timeout
+        self.expiry = expiry
+
+        # (station ID, transfer ID) -> { "total": int, "frames": { sequence: body }, "updated": float, "nacked": float }
+        self.transfers: Dict[Tuple[int, int], Dict[str, Union[int, float, Dict[int, bytes]]]] = {}
+        # (station ID, transfer ID) -> time it was completed, used to re-ACK when the sender didn't hear the first one
+        self.completed: Dict[Tuple[int, int], float] = {}
+        # station ID -> the radio that last heard from that station, that's where its ACK/NACKs go
+        self.routes: Dict[int, Callable[[bytes], None]] = {}
+        self.lock = threading.Lock()
+
+    def handleSegment(self, segment: bytes, send_control: Optional[Callable[[bytes], None]] = None) -> Optional[Tuple[int, int, bytes]]:
+        """Handles one EOF-terminated segment and returns (station ID, transfer ID, payload) once a transfer has every frame.
+
+        `send_control` is the radio the segment came in on, control frames go back out through whichever radio heard
+        from that station last.
+        """
+        with self.lock:
+            return self._handleSegment(segment, send_control or self.send_control)
+
+    def _handleSegment(self, segment: bytes, send_control: Callable[[bytes], None]) -> Optional[Tuple[int, int, bytes]]:
+        frame = _parseFrame(segment)
+        if frame is None and segment.startswith(b"{"):
+            # Unframed JSON from an older sender, pass it along as-is
+            _stats.increment("legacy_payloads")
+            return 0, 0, segment
+        if frame is None:
+            print(f"Dropping corrupted/unknown frame (length: {len(segment)})")
+            _stats.increment("frames_dropped")
+            return None
+        _stats.increment("frames_received")
+
+        frame_type, station_id, transfer_id, sequence, total, body = frame
+        if frame_type != _FRAME_DATA or total <= 0 or sequence >= total:
+            return None
+
+        now = time.monotonic()
+        self.routes[station_id] = send_control
+        key = (station_id, transfer_id)
+        if key in self.completed:
+            _stats.increment("acks_resent")
+            send_control(_buildFrame(_FRAME_ACK, station_id, transfer_id, 0, 0))
+            return None
+
+        transfer = self.transfers.setdefault(key, { "total": total, "frames": {}, "updated": now, "nacked": 0.0 })
+        if transfer["total"] != total:
+            # Same ID but a different shape, the sender must have restarted. Start over on this transfer.
+            transfer = self.transfers[key] = { "total": total, "frames": {}, "updated": now, "nacked": 0.0 }
+        frames: Dict[int, bytes] = transfer["frames"] # type: ignore
+        if sequence in frames:
+            _stats.increment("frames_duplicate")
+        frames[sequence] = body
+        transfer["updated"] = now
+        print(f"Received frame {sequence + 1}/{total} of transfer #{transfer_id} from station #{station_id:04x}")
+
+        if len(frames) < total:
+            return None
+
+        self.transfers.pop(key)
+        payload = b"".join(frames[idx] for idx in range(total))
+        if self.check_payload is not None:
+            try:
+                self.check_payload(payload)
+            except Exception as err:
+                print(f"Not acknowledging transfer #{transfer_id} from station #{station_id:04x}: {err}")
+                _stats.increment("transfers_rejected")
+                return None
+        self.completed[key] = now
+        _stats.increment("transfers_completed")
+        send_control(_buildFrame(_FRAME_ACK, station_id, transfer_id, 0, 0))
+        return station_id, transfer_id, payload
+
+    def poll(self):
+        """NACKs transfers that have stalled with frames missing and forgets about ones that are too old."""
+        with self.lock:
+            self._poll()
+
+    def _poll(self):
+        now = time.monotonic()
+        for (station_id, transfer_id), transfer in list(self.transfers.items()):
+            if now - transfer["updated"] > self.expiry: # type: ignore
+                print(f"Giving up on transfer #{transfer_id} from station #{station_id:04x}...")
+                _stats.increment("transfers_expired")
+                self.transfers.pop((station_id, transfer_id))
+                continue
+            if now - max(transfer["updated"], transfer["nacked"]) < self.nack_timeout: # type: ignore
+                continue
+
+            frames: Dict[int, bytes] = transfer["frames"] # type: ignore
+            missing = [sequence for sequence in range(transfer["total"]) if sequence not in frames][:_MAX_NACK_ENTRIES] # type: ignore
+            print(f"Transfer #{transfer_id} from station #{station_id:04x} is missing {len(missing)} frame(s), requesting them again...")
+            send_control = self.routes.get(station_id, self.send_control)
+            send_control(_buildFrame(_FRAME_NACK, station_id, transfer_id, 0, 0, b"".join(struct.pack(">H", sequence) for sequence in missing)))
+            transfer["nacked"] = now
+            _stats.increment("nacks_sent")
+
+        for key, completed in list(self.completed.items()):
+            if now - completed > self.expiry:
+                self.completed.pop(key)
+        _stats.gauge("transfers_in_progress", len(self.transfers))
+        _stats.gauge("stations_in_progress", len({station_id for station_id, _ in self.transfers}))
+
+class _PayloadReader:
+    """Small cursor over a binary payload."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def byte(self) -> int:
+        if self.offset >= len(self.data):
+            raise ValueError("Binary payload ended early")
+        value = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def bytes(self, length: int) -> bytes:
+        if self.offset + length > len(self.data):
+            raise ValueError("Binary payload ended early")
+        value = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return value
+
+    def varint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def zigzag(self) -> int:
+        value = self.varint()
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+    def string(self) -> str:
+        return self.bytes(self.varint()).decode('utf-8')
 
-    for team, scouts in data['teams'].items():
+    def tagged(self) -> Union[None, bool, int, float, str, list]:
+        tag = self.byte()
+        if tag == _VALUE_NULL:
+            return None
+        if tag == _VALUE_FALSE:
+            return False
+        if tag == _VALUE_TRUE:
+            return True
+        if tag == _VALUE_INT:
+            return self.zigzag()
+        if tag == _VALUE_FLOAT:
+            return struct.unpack("<d", self.bytes(8))[0]
+        if tag == _VALUE_STRING:
+            return self.string()
+        if tag == _VALUE_LIST:
+            return [self.tagged() for _ in range(self.varint())]
+        raise ValueError(f"Unknown binary value tag {tag}")
+
+def decodeBinaryScoutingData(data: bytes) -> Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]]:
+    """Decodes a payload built by `encodeScoutingData` in `SenderSender.py` back into the usual JSON structure."""
+    reader = _PayloadReader(data)
+    if reader.byte() != _BINARY_PAYLOAD_MAGIC:
+        raise ValueError("Not a binary scouting payload")
+    version = reader.byte()
+    if version != _BINARY_PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported binary payload version {version}")
+
+    metric_ids: List[str] = []
+    column_types: List[int] = []
+    template: Dict[str, str] = {}
+    for _ in range(reader.varint()):
+        column_type = reader.byte()
+        metric_id = reader.string()
+        metric_name = reader.string()
+        if not column_type & _COLUMN_UNLISTED:
+            template[metric_id] = metric_name
+        metric_ids.append(metric_id)
+        column_types.append(column_type & ~_COLUMN_UNLISTED)
+    bitmap_size = (len(metric_ids) + 7) // 8
+
+    teams: Dict[str, List[Dict[str, Union[str, bool, int, float]]]] = {}
+    for _ in range(reader.varint()):
+        team_header = reader.varint()
+        team = str(team_header >> 1) if not team_header & 1 else reader.bytes(team_header >> 1).decode('utf-8')
+
+        scouts: List[Dict[str, Union[str, bool, int, float]]] = []
+        for _ in range(reader.varint()):
+            presence = reader.bytes(bitmap_size)
+            present = [idx for idx in range(len(metric_ids)) if presence[idx >> 3] & (1 << (idx & 7))]
+            boolean_count = sum(1 for idx in present if column_types[idx] == _COLUMN_BOOL)
+            packed_booleans = reader.bytes((boolean_count + 7) // 8)
+
+            scout: Dict[str, Union[str, bool, int, float]] = {}
+            bit = 0
+            for idx in present:
+                column_type = column_types[idx]
+                if column_type == _COLUMN_BOOL:
+                    scout[metric_ids[idx]] = bool(packed_booleans[bit >> 3] & (1 << (bit & 7)))
+                    bit += 1
+                elif column_type == _COLUMN_UINT:
+                    scout[metric_ids[idx]] = reader.varint()
+                elif column_type == _COLUMN_SINT:
+                    scout[metric_ids[idx]] = reader.zigzag()
+                elif column_type == _COLUMN_STRING:
+                    scout[metric_ids[idx]] = reader.string()
+                else:
+                    scout[metric_ids[idx]] = reader.tagged() # type: ignore
+            scouts.append(scout)
+        teams[team] = scouts
+
+    return {"teams": teams, "template": template} # type: ignore
+
+def templateFingerprint(template: Dict[str, str]) -> int:
+    """Same fingerprint `SenderSender.py` puts in its digests, metric indexes are into the template sorted by metric ID."""
+    return zlib.crc32(json.dumps(sorted(template.items()), separators=(',', ':')).encode('utf-8'))
+
+def decodeDigest(data: bytes) -> Dict[str, Any]:
+    """Decodes a digest built by `encodeDigest` in `SenderSender.py`. Metrics are left as template indexes until the store
+    looks them up (see `CombinedScoutStore.addDigest`)."""
+    reader = _PayloadReader(data)
+    if reader.byte() != _DIGEST_PAYLOAD_MAGIC:
+        raise ValueError("Not a digest payload")
+    version = reader.byte()
+    if version != _DIGEST_PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported digest version {version}")
+
+    details, fingerprint = struct.unpack(">HI", reader.bytes(6))
+    superseded = [struct.unpack(">H", reader.bytes(2))[0] for _ in range(reader.varint())]
+    template: Dict[str, str] = {}
+    for _ in range(reader.varint()):
+        metric_id = reader.string()
+        template[metric_id] = reader.string()
+
+    teams: Dict[str, Dict[str, Any]] = {}
+    for _ in range(reader.varint()):
+        team = reader.string()
+        scouts = reader.varint()
+        metrics: Dict[int, List[Any]] = {}
+        for _ in range(reader.varint()):
+            idx = reader.varint()
+            metrics[idx] = [reader.varint(), reader.tagged(), reader.tagged()]
+        teams[team] = { "scouts": scouts, "metrics": metrics }
+
+    return { "digest": { "details": details, "fingerprint": fingerprint, "superseded": superseded, "template": template, "teams": teams } }
+
+def loadDictionaries(paths: List[str]) -> Dict[int, bytes]:
+    """Loads the compression dictionaries trained by `SenderSender.py`, keyed by the ID the sender puts in the payload."""
+    dictionaries: Dict[int, bytes] = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            dictionary = f.read()
+        dictionaries[zlib.crc32(dictionary)] = dictionary
+        print(f"Loaded compression dictionary #{zlib.crc32(dictionary):08x} from {path}")
+    return dictionaries
+
+def decompressPayload(data: bytes, dictionaries: Dict[int, bytes]) -> bytes:
+    (dictionary_id,) = _DICTIONARY_ID.unpack(data[1:1 + _DICTIONARY_ID.size])
+    if dictionary_id == 0:
+        decompressor = zlib.decompressobj(-15)
+    elif dictionary_id in dictionaries:
+        decompressor = zlib.decompressobj(-15, zdict=dictionaries[dictionary_id])
+    else:
+        raise ValueError(f"Payload was compressed with dictionary #{dictionary_id:08x}, which hasn't been loaded (see --dictionary)")
+    try:
+        return decompressor.decompress(data[1 + _DICTIONARY_ID.size:]) + decompressor.flush()
+    except zlib.error as err:
+        raise ValueError(f"Unable to decompress payload: {err}")
+
+def decodeScoutingPayload(data: bytes, dictionaries: Dict[int, bytes] = {}) -> Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]]:
+    """Turns a reassembled payload into scouting data, whether it was sent as JSON or binary (and compressed or not).
+
+    Digests come back as `{ "digest": {...} }` instead.
+    """
+    if len(data) > 0 and data[0] == _COMPRESSED_PAYLOAD_MAGIC:
+        data = decompressPayload(data, dictionaries)
+    if len(data) > 0 and data[0] == _BINARY_PAYLOAD_MAGIC:
+        return decodeBinaryScoutingData(data)
+    if len(data) > 0 and data[0] == _DIGEST_PAYLOAD_MAGIC:
+        return decodeDigest(data)
+    return json.loads(data.decode('utf-8'))
+
+class ScoutHashIndex:
+    """A set of canonical-JSON digests for scouts that have already been handled, so dedup doesn't rehash everything."""
+
+    def __init__(self, digests: List[str] = []):
+        self.digests = set(digests)
+
+    @staticmethod
+    def digest(scout: Dict[str, Union[str, bool, int, float]], team: Optional[str] = None) -> str:
+        # Sorting the keys makes the digest independent of whatever order the metrics were sent in
+        canonical = json.dumps(scout if team is None else [team, scout], sort_keys=True, separators=(',', ':'))
+        return hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
+    def add(self, scout_digest: str) -> bool:
+        """Adds the digest and returns whether it was new."""
+        if scout_digest in self.digests:
+            return False
+        self.digests.add(scout_digest)
+        return True
+
+    def toList(self) -> List[str]:
+        return list(self.digests)
+
+    def __contains__(self, scout_digest: str) -> bool:
+        return scout_digest in self.digests
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+class ScoutAnalytics:
+    """Per-team aggregates of the stored scouts that get updated as scouts come in.
+
+    Numbers and booleans get folded into a count/sum/min/max, stopwatches get parsed into lap times first and anything
+    else gets counted. Aggregates are only ever updated with the new scouts, so looking a team up stays instant no
+    matter how big the event gets. Digests of scouts that are still on their way show up as each team's "pending" stats.
+    """
+
+    def __init__(self, template: Dict[str, str], pending: Optional[Dict[str, Dict[str, Any]]] = None):
+        # Shared with the store, so metric names (and pending digests) are always up to date
+        self.template = template
+        self.pending = pending if pending is not None else {}
+        # team -> metric ID -> any of "numbers"/"laps" ({ "count", "sum", "min", "max" }), "lap_scouts" and "values" (Counter)
+        self.aggregates: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.scout_counts: Dict[str, int] = {}
+        self.changed = False
+
+    @staticmethod
+    def _updateAggregate(aggregate: Dict[str, Any], values: array.array):
+        if len(values) <= 0:
+            return
+        aggregate.setdefault("count", 0)
+        aggregate.setdefault("sum", 0.0)
+        aggregate.setdefault("min", math.inf)
+        aggregate.setdefault("max", -math.inf)
+        aggregate["count"] += len(values)
+        aggregate["sum"] += math.fsum(values)
+        aggregate["min"] = min(aggregate["min"], min(values))
+        aggregate["max"] = max(aggregate["max"], max(values))
+
+    def add(self, team: str, scouts: List[Dict[str, Union[str, bool, int, float]]]):
+        """Folds new scouts for a team into that team's aggregates."""
+        if len(scouts) <= 0:
+            return
+
+        # Sort the values out by metric first so every aggregate only gets touched once per batch
+        numbers: Dict[str, array.array] = {}
+        laps: Dict[str, array.array] = {}
+        lap_scouts: Counter = Counter()
+        texts: Dict[str, Counter] = {}
         for scout in scouts:
-            scout_hash = hashlib.md5(json.dumps(scout).encode('utf-8')).hexdigest()
-            if team in combined_scouts["teams"]:
-                hashes = [hashlib.md5(json.dumps(s).encode('utf-8')).hexdigest() for s in combined_scouts["teams"][team]]
-                # It looks like we already have this match data scouted, skip it
-                if scout_hash in hashes:
+            for metric_id, value in scout.items():
+                if isinstance(value, (bool, int, float)):
+                    numbers.setdefault(metric_id, array.array('d')).append(float(value))
+                elif isinstance(value, list) or (isinstance(value, str) and _STOPWATCH_PATTERN.match(value)):
+                    lap_times = [float(lap) for lap in (value if isinstance(value, list) else value.split(","))]
+                    laps.setdefault(metric_id, array.array('d')).extend(lap_times)
+                    if len(lap_times) > 0:
+                        lap_scouts[metric_id] += 1
+                elif isinstance(value, str) and len(value) > 0:
+                    texts.setdefault(metric_id, Counter())[value] += 1
+
+        team_aggregates = self.aggregates.setdefault(team, {})
+        for metric_id, values in numbers.items():
+            self._updateAggregate(team_aggregates.setdefault(metric_id, {}).setdefault("numbers", {}), values)
+        for metric_id, values in laps.items():
+            aggregate = team_aggregates.setdefault(metric_id, {})
+            self._updateAggregate(aggregate.setdefault("laps", {}), values)
+            aggregate["lap_scouts"] = aggregate.get("lap_scouts", 0) + lap_scouts[metric_id]
+        for metric_id, counts in texts.items():
+            team_aggregates.setdefault(metric_id, {}).setdefault("values", Counter()).update(counts)
+
+        self.scout_counts[team] = self.scout_counts.get(team, 0) + len(scouts)
+        self.changed = True
+
+    def _pendingSummary(self) -> Dict[str, Any]:
+        """Every pending digest combined per team, the digests only have a count, sum and max for each metric."""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for digest in self.pending.values():
+            for team, team_digest in digest["teams"].items():
+                team_totals = totals.setdefault(team, { "scouts": 0, "metrics": {} })
+                team_totals["scouts"] += team_digest["scouts"]
+                for metric_id, (count, total, maximum) in team_digest["metrics"].items():
+                    metric = team_totals["metrics"].setdefault(metric_id, [0, 0, maximum])
+                    metric[0] += count
+                    metric[1] += total
+                    metric[2] = max(metric[2], maximum)
+
+        return {team: {
+            "scouts": team_totals["scouts"],
+            "metrics": {
+                self.template.get(metric_id, metric_id): { "count": count, "mean": round(total / count, 3), "max": maximum }
+                for metric_id, (count, total, maximum) in team_totals["metrics"].items() if count > 0
+            },
+        } for team, team_totals in totals.items()}
+
+    def summary(self, teams: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Per-team stats for every metric, keyed by the metric's name."""
+        summary: Dict[str, Any] = {}
+        pending = self._pendingSummary()
+        for team in (teams if teams is not None else sorted({*self.aggregates.keys(), *pending.keys()}, key=lambda t: (len(t), t))):
+            if team not in self.aggregates and team not in pending:
+                continue
+            metrics: Dict[str, Any] = {}
+            for metric_id, aggregate in self.aggregates.get(team, {}).items():
+                stats: Dict[str, Any] = {}
+                if "count" in aggregate.get("numbers", {}):
+                    numbers = aggregate["numbers"]
+                    stats.update({ "count": numbers["count"], "mean": round(numbers["sum"] / numbers["count"], 3), "min": numbers["min"], "max": numbers["max"] })
+                if "count" in aggregate.get("laps", {}):
+                    lap_stats = aggregate["laps"]
+                    stats.update({
+                        "laps": lap_stats["count"],
+                        "mean_lap": round(lap_stats["sum"] / lap_stats["count"], 3),
+                        "min_lap": lap_stats["min"],
+                        "max_lap": lap_stats["max"],
+                        "laps_per_scout": round(lap_stats["count"] / aggregate["lap_scouts"], 3),
+                    })
+                if "values" in aggregate:
+                    stats["values"] = dict(aggregate["values"].most_common())
+                if len(stats) > 0:
+                    metrics[self.template.get(metric_id, metric_id)] = stats
+            summary[team] = { "scouts": self.scout_counts.get(team, 0), "metrics": metrics }
+            if team in pending:
+                summary[team]["pending"] = pending[team]
+        return summary
+
+def _lockFile(path: str) -> IO[str]:
+    """Takes an exclusive lock on the file (and keeps it open), the OS lets go of it if the process dies."""
+    lock_file = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise Exception(f"{path} is locked, is another receiver (or import) still running?")
+    return lock_file
+
+class CombinedScoutStore:
+    """The receiver's copy of all scouting data.
+
+    combined_scouts.json acts as a snapshot and every new scout gets appended to a JSONL journal, so a message only costs
+    the size of the message to write. combined_scouts.json and combined_scouts.csv are kept around as exports: CSV rows
+    are appended as scouts come in and a background thread periodically folds the journal back into the JSON snapshot
+    (and rebuilds the CSV if the template changed). Per-team stats are kept in `analytics` and exported to
+    combined_scouts.summary.json.
+
+    Digests that come in ahead of the full scouts are kept under "digests" (keyed by station and the transfer the full
+    scouts are coming in on) until those scouts show up. "digest_templates" has the metric IDs every template
+    fingerprint refers to, since digests only send metric indexes once the template has been received. A digest whose
+    full scouts never show up (and that never gets superseded) is dropped after `digest_expiry` seconds.
+
+    Only one store can write to the files at a time (each one keeps its own copy in memory and would overwrite the
+    other's exports), so anything but a `read_only` store holds `lock_path` until it's closed. A `read_only` store just
+    loads the snapshot and replays the journal, so it can be used for queries while another receiver is running. It
+    never opens the journal or writes (or rotates) anything.
+    """
+
+    def __init__(self, json_path: str = _COMBINED_SCOUTING_JSON, csv_path: str = _COMBINED_SCOUTING_CSV, journal_path: str = _COMBINED_SCOUTING_JOURNAL, index_path: str = _COMBINED_SCOUTING_INDEX, summary_path: str = _COMBINED_SCOUTING_SUMMARY, lock_path: str = _COMBINED_SCOUTING_LOCK, export_interval: float = 30.0, digest_expiry: float = 3600.0, read_only: bool = False):
+        self.json_path = json_path
+        self.csv_path = csv_path
+        self.journal_path = journal_path
+        self.index_path = index_path
+        self.summary_path = summary_path
+        self.export_interval = export_interval
+        self.digest_expiry = digest_expiry
+        self.read_only = read_only
+        self.lock_file = None if self.read_only else _lockFile(lock_path)
+
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        # { "teams": { "Team": [{"metric": "value"}], "template": { "metric_id" : "metric_name" } }
+        self.combined_scouts: Dict[str, Dict[str, Any]] = {"teams": {}, "template": {}, "digests": {}, "digest_templates": {}}
+        if os.path.exists(self.json_path):
+            with open(self.json_path, "r") as f:
+                self.combined_scouts = json.load(f)
+            self.combined_scouts.setdefault("template", {})
+            self.combined_scouts.setdefault("digests", {})
+            self.combined_scouts.setdefault("digest_templates", {})
+        # Digests whose full scouts already came in, so a digest that shows up late doesn't get kept around
+        self.resolved: Set[str] = set()
+        self.scout_count = sum(len(scouts) for scouts in self.combined_scouts["teams"].values())
+        self.index = self._loadIndex()
+
+        # The CSV always gets rebuilt once on startup, after that rows are just appended until the template changes
+        self.csv_stale = True
+        self.dirty = False
+
+        # A journal that was rotated out but never made it into the snapshot (crash mid-export) gets replayed first
+        for path in (self.journal_path + ".old", self.journal_path):
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                self._replayJournal(path)
+        if not self.read_only:
+            torn = False
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+                with open(self.journal_path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self.journal = open(self.journal_path, "a+", encoding="utf-8")
+            if torn:
+                # A crash left half a line at the end, the next entry can't end up glued onto it
+                self.journal.write("\n")
+
+        # Built once from everything that's stored, after that it only ever sees new scouts
+        self.analytics = ScoutAnalytics(self.combined_scouts["template"], self.combined_scouts["digests"])
+        with _stats.timed("analytics"):
+            for team, scouts in self.combined_scouts["teams"].items():
+                self.analytics.add(team, scouts) # type: ignore
+        self._expireDigests()
+
+        if not self.read_only:
+            self.export_thread = threading.Thread(target=self._exportLoop, daemon=True)
+            self.export_thread.start()
+
+    def _loadIndex(self) -> ScoutHashIndex:
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    data = json.load(f)
+                # Only rehash everything if combined_scouts.json was changed behind our back
+                if data['scouts'] == self.scout_count:
+                    return ScoutHashIndex(data['digests'])
+            except (ValueError, KeyError, TypeError):
+                # It can always be rebuilt from combined_scouts.json, so a broken index isn't worth failing over
+                print(f"Unable to read {self.index_path}...")
+
+        print(f"Rebuilding scout index from {self.json_path}...")
+        return ScoutHashIndex([ScoutHashIndex.digest(scout, team) for team, scouts in self.combined_scouts["teams"].items() for scout in scouts]) # type: ignore
+
+    def _replayJournal(self, path: str):
+        print(f"Replaying scouting journal {path}...")
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Most likely a half written line from a crash, everything before it is still good
                     continue
-            
-                combined_scouts["teams"][team].append(scout) # type: ignore
+                if "template" in entry:
+                    self.combined_scouts["template"].update(entry["template"]) # type: ignore
+                elif "digest_template" in entry:
+                    self.combined_scouts["digest_templates"][entry["digest_template"]] = entry["metrics"]
+                elif "digest" in entry:
+                    self.combined_scouts["digests"][entry.pop("digest")] = entry
+                elif "resolved" in entry:
+                    self.combined_scouts["digests"].pop(entry["resolved"], None)
+                    self.resolved.add(entry["resolved"])
+                elif self.index.add(ScoutHashIndex.digest(entry["scout"], entry["team"])):
+                    self.combined_scouts["teams"].setdefault(entry["team"], []).append(entry["scout"]) # type: ignore
+                    self.scout_count += 1
+                self.dirty = True
+
+    def _csvRow(self, team: str, scout: Dict[str, Union[str, bool, int, float]]) -> List[Union[str, bool, int, float]]:
+        # This is mainly just to guarantee that the CSV rows have the same order as the header.
+        return [team, *[scout.get(metric_id, "") for metric_id in self.combined_scouts["template"].keys()]]
+
+    @staticmethod
+    def _digestKey(station_id: int, transfer_id: int) -> str:
+        return f"{station_id:04x}:{transfer_id:04x}"
+
+    def _addMetrics(self, template: Dict[str, str]) -> Dict[str, str]:
+        """Journals any metrics that aren't in the template yet and returns them."""
+        new_metrics = {metric_id: name for metric_id, name in template.items() if metric_id not in self.combined_scouts["template"]}
+        if len(new_metrics) > 0:
+            self.combined_scouts["template"].update(new_metrics)
+            self.journal.write(json.dumps({ "template": new_metrics }) + "\n")
+            # The CSV header changed, so it has to be rebuilt rather than appended to
+            self.csv_stale = True
+            self.dirty = True
+        return new_metrics
+
+    def _resolveDigest(self, key: str):
+        """Drops a pending digest, its full scouts either came in or are being sent again under another transfer."""
+        self.resolved.add(key)
+        if self.combined_scouts["digests"].pop(key, None) is not None:
+            self.journal.write(json.dumps({ "resolved": key }) + "\n")
+            self.dirty = True
+            self.analytics.changed = True
+
+    def _expireDigests(self):
+        """Drops digests that have been waiting on their full scouts for too long, the scouts most likely came in on a
+        transfer the sender never got to supersede them with."""
+        cutoff = time.time() - self.digest_expiry
+        for key, entry in list(self.combined_scouts["digests"].items()):
+            if time.mktime(time.strptime(entry["received_at"], "%Y-%m-%dT%H:%M:%S")) >= cutoff:
+                continue
+            print(f"Digest {key} never got its full scouts, dropping it...")
+            _stats.increment("digests_expired")
+            if self.read_only:
+                self.combined_scouts["digests"].pop(key)
             else:
-                combined_scouts["teams"].update({ team : [scout]}) # type: ignore
-    
-    if "template" not in combined_scouts and "template" in data:
-        combined_scouts["template"] = data["template"]
-
-    with open(_COMBINED_SCOUTING_JSON, "w+") as f:
-        json.dump(combined_scouts, f, indent=4)
-
-    with open(_COMBINED_SCOUTING_CSV, "w+", newline='', encoding="utf-8") as f:
-        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-        writer.writerow(['Team Number', *[value for value in combined_scouts["template"].values()]])
-        
-        for team, scouts in combined_scouts['teams'].items():
-            for scout in scouts:
-                # This is mainly just to guarantee that the CSV rows have the same order as the header.
-                # In theory, it always should, but it can't really hurt.
-                ordered_values = [scout[x] for x in combined_scouts["template"].keys()] # type: ignore
-                writer.writerow([team, *ordered_values])
+                self._resolveDigest(key)
 
+    def _addDigestTemplate(self, template: Dict[str, str]):
+        """Remembers which metric IDs a template's fingerprint refers to, digests only send it until the sender knows we have it."""
+        fingerprint = f"{templateFingerprint(template):08x}"
+        if len(template) > 0 and fingerprint not in self.combined_scouts["digest_templates"]:
+            self.combined_scouts["digest_templates"][fingerprint] = sorted(template.keys())
+            self.journal.write(json.dumps({ "digest_template": fingerprint, "metrics": sorted(template.keys()) }) + "\n")
+            self.dirty = True
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--port", default="auto")
-    parser.add_argument("--baud", default=9600, type=int)
-    parser.add_argument("--timeout", default=35.00, type=float)
+    def addDigest(self, station_id: int, digest: Dict[str, Any]) -> bool:
+        """Keeps a digest around until the full scouts it summarizes come in, returns False if they already have."""
+        with self.lock:
+            fingerprint = f"{digest['fingerprint']:08x}"
+            self._addMetrics(digest["template"])
+            self._addDigestTemplate(digest["template"])
+            metric_ids: List[str] = self.combined_scouts["digest_templates"].get(fingerprint, [])
+            if len(metric_ids) <= 0:
+                print(f"Digest from station #{station_id:04x} uses template #{fingerprint}, which hasn't been received yet...")
 
-    parser.add_argument("--import-file", type=str, default=None)
-    args = parser.parse_args()
+            for transfer_id in digest["superseded"]:
+                self._resolveDigest(self._digestKey(station_id, transfer_id))
 
-    # Change what we're doing based on the import flag
-    if args.import_file is not None:
-        if not os.path.exists(args.import_file):
-            raise Exception(f"Unable to find file at {args.import_file}!!")
-        with open(args.import_file, "r+") as file:
-            data = json.load(file)
-            handleScoutingData(data)
-        
-        return
+            key = self._digestKey(station_id, digest["details"])
+            added = key not in self.resolved
+            if added:
+                entry = {
+                    "station": station_id,
+                    "details": digest["details"],
+                    "received_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "teams": {team: {
+                        "scouts": team_digest["scouts"],
+                        # Metrics from a template that never made it here keep their index
+                        "metrics": { (metric_ids[idx] if idx < len(metric_ids) else f"#{idx}"): aggregate for idx, aggregate in team_digest["metrics"].items() },
+                    } for team, team_digest in digest["teams"].items()},
+                }
+                self.combined_scouts["digests"][key] = entry
+                self.journal.write(json.dumps({ "digest": key, **entry }) + "\n")
+                self.dirty = True
+                self.analytics.changed = True
+            self.journal.flush()
+        return added
+
+    def importScouts(self, template: Dict[str, str], scouts: List[Tuple[str, Dict[str, Union[str, bool, int, float]], str]]) -> int:
+        """Adds (team, scout, digest) entries in bulk and returns how many were new.
+
+        Nothing gets journaled or appended to the CSV, the next export writes combined_scouts.json and combined_scouts.csv
+        once with everything in it.
+        """
+        new_scouts: Dict[str, List[Dict[str, Union[str, bool, int, float]]]] = {}
+        with self.lock:
+            self._addMetrics(template)
+            self._addDigestTemplate(template)
+            self.journal.flush()
+            for team, scout, scout_digest in scouts:
+                # Dedups against what's stored and between the files being imported in the same pass
+                if not self.index.add(scout_digest):
+                    continue
+                self.combined_scouts["teams"].setdefault(team, []).append(scout)
+                new_scouts.setdefault(team, []).append(scout)
+
+            added = sum(len(team_scouts) for team_scouts in new_scouts.values())
+            self.scout_count += added
+            if added > 0:
+                self.dirty = True
+                self.csv_stale = True
+
+            with _stats.timed("analytics"):
+                for team, team_scouts in new_scouts.items():
+                    self.analytics.add(team, team_scouts)
+        return added
+
+    def add(self, data: Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]], transfer: Optional[Tuple[int, int]] = None) -> int:
+        """Journals any scouts we haven't seen before and returns how many there were.
+
+        `transfer` is the (station ID, transfer ID) the scouts came in on, that transfer's digest is no longer pending.
+        """
+        new_rows: List[List[Union[str, bool, int, float]]] = []
+        new_scouts: Dict[str, List[Dict[str, Union[str, bool, int, float]]]] = {}
+        with self.lock:
+            new_metrics = self._addMetrics(data.get("template", {})) # type: ignore
+            self._addDigestTemplate(data.get("template", {})) # type: ignore
+
+            for team, scouts in data['teams'].items():
+                for scout in scouts:
+                    # It looks like we already have this match data scouted, skip it
+                    if not self.index.add(ScoutHashIndex.digest(scout, team)): # type: ignore
+                        continue
+
+                    self.combined_scouts["teams"].setdefault(team, []).append(scout) # type: ignore
+                    self.scout_count += 1
+                    self.journal.write(json.dumps({ "team": team, "scout": scout }) + "\n")
+                    new_rows.append(self._csvRow(team, scout)) # type: ignore
+                    new_scouts.setdefault(team, []).append(scout) # type: ignore
+
+            if transfer is not None:
+                self._resolveDigest(self._digestKey(*transfer))
+            self.journal.flush()
+            if len(new_rows) > 0 or len(new_metrics) > 0:
+                self.dirty = True
+
+            with _stats.timed("analytics"):
+                for team, scouts in new_scouts.items():
+                    self.analytics.add(team, scouts)
+
+            if not self.csv_stale and len(new_rows) > 0:
+                with open(self.csv_path, "a", newline='', encoding="utf-8") as f:
+                    csv.writer(f, quoting=csv.QUOTE_ALL).writerows(new_rows)
+
+        return len(new_rows)
+
+    def export(self):
+        """Folds the journal into combined_scouts.json, rebuilds combined_scouts.csv if it's out of date and rewrites the summary."""
+        with _stats.timed("export"):
+            self._export()
+            self._exportSummary()
+
+    def _export(self):
+        with self.lock:
+            self._expireDigests()
+            if self.csv_stale:
+                with open(self.csv_path + ".tmp", "w+", newline='', encoding="utf-8") as f:
+                    writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                    writer.writerow(['Team Number', *[value for value in self.combined_scouts["template"].values()]])
+                    for team, scouts in self.combined_scouts['teams'].items():
+                        writer.writerows(self._csvRow(team, scout) for scout in scouts) # type: ignore
+                os.replace(self.csv_path + ".tmp", self.csv_path)
+                self.csv_stale = False
+
+            if not self.dirty:
+                return
+
+            # Stored scouts never change, so copying the lists is enough to get a consistent snapshot to write out
+            # without holding onto the lock. Anything added from here on goes into a fresh journal.
+            snapshot = {
+                "teams": {team: list(scouts) for team, scouts in self.combined_scouts["teams"].items()},
+                "template": dict(self.combined_scouts["template"]),
+                # Digests and their templates never change once they're stored either
+                "digests": dict(self.combined_scouts["digests"]),
+                "digest_templates": dict(self.combined_scouts["digest_templates"]),
+            }
+            index_snapshot = { "scouts": self.scout_count, "digests": self.index.toList() }
+            _stats.gauge("scouts_stored", self.scout_count)
+            self.journal.close()
+            if os.path.exists(self.journal_path + ".old"):
+                # The last export never finished, so keep everything that was in that journal too
+                with open(self.journal_path + ".old", "a", encoding="utf-8") as old, open(self.journal_path, "r", encoding="utf-8") as journal:
+                    old.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.journal_path + ".old")
+            self.journal = open(self.journal_path, "a+", encoding="utf-8")
+            self.dirty = False
+
+        with open(self.json_path + ".tmp", "w+") as f:
+            json.dump(snapshot, f, indent=4)
+        os.replace(self.json_path + ".tmp", self.json_path)
+        with open(self.index_path + ".tmp", "w+") as f:
+            json.dump(index_snapshot, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.remove(self.journal_path + ".old")
+
+    def _exportSummary(self):
+        with self.lock:
+            if not self.analytics.changed:
+                return
+            summary = { "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "teams": self.analytics.summary() }
+            self.analytics.changed = False
+
+        with open(self.summary_path + ".tmp", "w+") as f:
+            json.dump(summary, f, indent=4)
+        os.replace(self.summary_path + ".tmp", self.summary_path)
+
+    def query(self, teams: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Per-team stats straight from the in-memory aggregates."""
+        with self.lock:
+            return self.analytics.summary(teams)
+
+    def _exportLoop(self):
+        while not self._stop_event.wait(self.export_interval):
+            try:
+                self.export()
+            except Exception:
+                traceback.print_exc()
+
+    def close(self):
+        """Stops the background exports and makes sure the exports are up to date."""
+        if self.read_only:
+            return
+        self._stop_event.set()
+        self.export_thread.join()
+        self.export()
+        self.journal.close()
+        self.lock_file.close() # type: ignore
+
+def handleScoutingData(data: Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]], store: CombinedScoutStore, transfer: Optional[Tuple[int, int]] = None):
+    print(f"Received new scout data...")
+    added = store.add(data, transfer)
+    _stats.increment("payloads_ingested")
+    _stats.increment("scouts_added", added)
+    print(f"Stored {added} new scout(s)")
+
+def loadImportFile(path: str) -> Tuple[Dict[str, str], List[Tuple[str, Dict[str, Union[str, bool, int, float]], str]]]:
+    """Parses a JSON export (saved_scouts.json, combined_scouts.json, ...) into its template and (team, scout, digest) entries.
+
+    This runs in a worker process for `--import-file`. Stopwatches get turned into the same comma separated strings the
+    sender sends over the radio, so a scout dedups the same way no matter how it got here.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # combined_scouts.summary.json has "teams" too, but every team there is a dict of stats instead of a list of scouts
+    if not isinstance(data, dict) or not isinstance(data.get("teams"), dict) or not all(isinstance(team_scouts, list) and all(isinstance(scout, dict) for scout in team_scouts) for team_scouts in data["teams"].values()):
+        raise ValueError(f"{path} doesn't look like a scouting export")
+
+    scouts: List[Tuple[str, Dict[str, Union[str, bool, int, float]], str]] = []
+    for team, team_scouts in data["teams"].items():
+        for scout in team_scouts:
+            scout = {metric_id: ",".join(str(lap) for lap in value) if isinstance(value, list) else value for metric_id, value in scout.items()}
+            scouts.append((team, scout, ScoutHashIndex.digest(scout, team)))
+    return data.get("template", {}), scouts
 
-    port = args.port
+def findImportFiles(paths: List[str]) -> List[str]:
+    """Every file to import, directories get expanded into the JSON files inside of them."""
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            raise Exception(f"Unable to find file at {path}!!")
+    return files
 
+def importFiles(paths: List[str], store: CombinedScoutStore, workers: Optional[int] = None) -> int:
+    """Parses and hashes every file in a process pool, then adds all of their scouts to the store in one pass.
+
+    A file that can't be read (or isn't an export, like a scouting_cache.json in the same folder) gets skipped.
+    """
+    template: Dict[str, str] = {}
+    scouts: List[Tuple[str, Dict[str, Union[str, bool, int, float]], str]] = []
+    loaded = 0
+    with _stats.timed("import_parse"), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(path, pool.submit(loadImportFile, path)) for path in paths]
+        for path, future in futures:
+            try:
+                file_template, file_scouts = future.result()
+            except Exception as e:
+                print(f"Skipping {path}: {e}")
+                _stats.increment("import_files_skipped")
+                continue
+            loaded += 1
+            print(f"Loaded {len(file_scouts)} scout(s) from {path}")
+            # The first file to name a metric wins, the same as when they come in over the radio
+            template.update({metric_id: name for metric_id, name in file_template.items() if metric_id not in template})
+            scouts.extend(file_scouts)
+
+    with _stats.timed("ingest"):
+        added = store.importScouts(template, scouts)
+    _stats.increment("scouts_added", added)
+    print(f"Imported {added} new scout(s) out of {len(scouts)} from {loaded} file(s)")
+    return added
+
+def handleDigest(station_id: int, digest: Dict[str, Any], store: CombinedScoutStore):
+    teams = ", ".join(f"{team} ({team_digest['scouts']})" for team, team_digest in digest["teams"].items())
+    print(f"Received digest from station #{station_id:04x}, full scouts coming on transfer #{digest['details']}: {teams}")
+    if not store.addDigest(station_id, digest):
+        print(f"Full scouts for that digest already came in, skipping it")
+    _stats.increment("digests_ingested")
+
+
+class SegmentSplitter:
+    """Splits a raw serial byte stream into EOF-terminated segments, no matter how the reads happen to chop it up."""
+
+    def __init__(self, eof: bytes = _SCOUTING_PACKET_EOF, max_buffer: int = 64 * 1024):
+        self.eof = eof
+        self.max_buffer = max_buffer
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Adds newly read bytes and returns every segment (minus the EOF) that's now complete."""
+        # The EOF could have been split between the last read and this one
+        search_from = max(0, len(self.buffer) - len(self.eof) + 1)
+        self.buffer += data
+
+        segments: List[bytes] = []
+        while True:
+            eof_idx = self.buffer.find(self.eof, search_from)
+            if eof_idx < 0:
+                break
+            segments.append(bytes(self.buffer[:eof_idx]))
+            del self.buffer[:eof_idx + len(self.eof)]
+            search_from = 0
+
+        if len(self.buffer) > self.max_buffer:
+            # Nothing but garbage (or a missed EOF) for a while, drop it rather than growing forever
+            print(f"Dropping {len(self.buffer)} bytes of serial data without an EOF...")
+            self.buffer.clear()
+        return segments
+
+class SerialReader(threading.Thread):
+    """Reads whatever serial data is available and hands finished payloads off to the ingest worker.
+
+    Splitting frames out and reassembling transfers is cheap, so it happens right here. Decoding and storing the payload
+    happens on the ingest worker so a slow disk never holds up reading from serial.
+    """
+
+    def __init__(self, serial_device: serial.Serial, reassembler: TransferReassembler, payloads: "queue.Queue[Tuple[int, int, bytes]]"):
+        super().__init__(daemon=True)
+        self.serial_device = serial_device
+        self.reassembler = reassembler
+        self.payloads = payloads
+
+    def run(self):
+        splitter = SegmentSplitter()
+        try:
+            while True:
+                # Blocks until at least one byte shows up (or the timeout hits), then takes everything that's waiting
+                data = self.serial_device.read(max(1, self.serial_device.in_waiting))
+                _stats.increment("serial_bytes_read", len(data))
+                for segment in splitter.feed(data):
+                    transfer = self.reassembler.handleSegment(segment, self.serial_device.write)
+                    if transfer is not None:
+                        print(f"Received payload (length: {len(transfer[2])})")
+                        self.payloads.put(transfer)
+                        _stats.gauge("queue_depth", self.payloads.qsize())
+                self.reassembler.poll()
+        except (serial.SerialException, OSError):
+            # The device most likely got unplugged, main will go looking for it again
+            traceback.print_exc()
+
+def ingestPayloads(payloads: "queue.Queue[Tuple[int, int, bytes]]", store: CombinedScoutStore, dictionaries: Dict[int, bytes]):
+    """Decodes and stores payloads from the serial reader, one at a time."""
+    while True:
+        station_id, transfer_id, payload = payloads.get()
+        _stats.gauge("queue_depth", payloads.qsize())
+        _stats.increment("payload_bytes_received", len(payload))
+        try:
+            with _stats.timed("decode"):
+                data = decodeScoutingPayload(payload, dictionaries)
+            if "digest" in data:
+                with _stats.timed("ingest_digest"):
+                    handleDigest(station_id, data["digest"], store)
+                continue
+            with _stats.timed("ingest"):
+                handleScoutingData(data, store, (station_id, transfer_id))
+        except Exception:
+            # Anything wrong with one payload (malformed JSON, missing teams, odd values, ...) can't be allowed to take
+            # down the only ingest thread (anything that couldn't be decoded was never ACKed in the first place)
+            _stats.increment("payloads_malformed")
+            traceback.print_exc()
+
+def findPorts() -> List[str]:
+    """Every LoRa receiver that's plugged in, or just the first serial port if none of them look like one."""
+    ports = sorted(serial.tools.list_ports.comports(), key=lambda p: str(p))
+    feathers = [port.device for port in ports if "Feather 32u4" in str(port)]
+    return feathers if len(feathers) > 0 else [port.device for port in ports[:1]]
+
+def readPort(port: str, baud: int, timeout: float, reassembler: TransferReassembler, payloads: "queue.Queue[Tuple[int, int, bytes]]"):
+    """Keeps a serial reader running on one port, opening it again whenever it gets unplugged."""
     while True:
-        if args.port == "auto":
-            while port == "auto":
-                ports = list(serial.tools.list_ports.comports())
-                if ports is None or len(ports) <= 0:
-                    print(f"Unable to find COM port for serial device...")
-                port = ports[0]
-        
         print(f"Detected/found serial device on COM port: '{port}'")
 
         serial_device: serial.Serial = None # type: ignore
         while serial_device is None:
             try:
-                serial_device = serial.Serial(port[0], args.baud, timeout=args.timeout)
+                serial_device = serial.Serial(port, baud, timeout=timeout)
                 serial_device.isOpen()
             except IOError: # If the port is already opened, close it and open it again and then try again
                 if serial_device is not None:
@@ -96,36 +1169,85 @@ def main():
                 print("COM port was already open, was closed and opened again!")
                 time.sleep(5)
 
-        print(f"Opened serial device on COM port...")
+        print(f"Opened serial device on COM port '{port}'...")
+        print(f"Waiting for serial data...")
 
-        try:
-            while True:
-                print(f"Waiting for serial data...")
-                if serial_device.inWaiting():
-                    data = serial_device.read_until(_SCOUTING_PACKET_EOF)
-                    if data is None: 
-                        continue
-                    if len(data) <= len(_SCOUTING_PACKET_EOF):
-                        continue
-                    
-                    data = data.strip(_SCOUTING_PACKET_EOF)
-                    hex_data = " ".join([hex(byte) for byte in data])
-                    print(f"Received data (length: {len(data)}): {data} :: {hex_data}")
-                    
-                    if not data.endswith(_SCOUTING_PACKET_EOF):
-                        print(f"Received malformed data... Missing packet EOF")
-                        continue
+        reader = SerialReader(serial_device, reassembler, payloads)
+        reader.start()
+        reader.join()
+        serial_device.close()
 
-                    json_data = json.loads(data.decode('ascii'))
-                    handleScoutingData(json_data)
-                time.sleep(1.25)
-        except Exception:
-            traceback.print_exc()
-            continue
+def main():
+    parser = argparse.ArgumentParser()
+    # Pass it more than once to listen on more than one radio, defaults to every Feather 32u4 (or the first port)
+    parser.add_argument("--port", type=str, action="append", default=[])
+    parser.add_argument("--baud", default=9600, type=int)
+    # How long the serial reader waits for data before checking on stalled transfers
+    parser.add_argument("--timeout", default=1.00, type=float)
+    parser.add_argument("--nack-timeout", default=2.00, type=float)
+
+    # Compression dictionaries from `train-dictionary` on the sender, more than one can be loaded when switching over
+    parser.add_argument("--dictionary", type=str, action="append", default=[])
+
+    # Any number of JSON exports (or directories of them) to import in one go, e.g. saved_scouts.json off a USB stick.
+    # The receiver has to be stopped first, the import refuses to start while it holds combined_scouts.lock.
+    parser.add_argument("--import-file", type=str, nargs="+", default=None)
+    # Processes used to parse the imported files, defaults to one per CPU
+    parser.add_argument("--import-workers", type=int, default=None)
+    # Prints the per-team stats for these teams (or `all` of them) and exits
+    parser.add_argument("--query", type=str, nargs="+", default=None)
+    # How often the journal gets folded back into combined_scouts.json (and the CSV gets rebuilt if needed)
+    parser.add_argument("--export-interval", default=30.00, type=float)
+    # Stage timings/counters get written here every so often
+    parser.add_argument("--metrics-file", type=str, default="./receiver_metrics.json")
+    parser.add_argument("--metrics-interval", default=10.00, type=float)
+    args = parser.parse_args()
+
+    dictionary_paths = args.dictionary
+    if len(dictionary_paths) <= 0 and os.path.exists(_SCOUTING_DICTIONARY):
+        dictionary_paths = [_SCOUTING_DICTIONARY]
+    dictionaries = loadDictionaries(dictionary_paths)
+
+    if args.query is not None:
+        # Read only, so it's safe to query while the receiver is running (it'll see everything up to the last message)
+        with contextlib.redirect_stdout(sys.stderr):
+            store = CombinedScoutStore(read_only=True)
+        print(json.dumps(store.query(None if "all" in args.query else args.query), indent=4))
+        return
+
+    store = CombinedScoutStore(export_interval=args.export_interval)
+    if args.metrics_file:
+        _stats.startWriting(args.metrics_file, args.metrics_interval)
+
+    # Change what we're doing based on the import flag
+    if args.import_file is not None:
+        importFiles(findImportFiles(args.import_file), store, args.import_workers)
+        # Writes combined_scouts.json/combined_scouts.csv once with everything that was imported
+        store.close()
+        _stats.stopWriting()
+        return
+
+    payloads: "queue.Queue[Tuple[int, int, bytes]]" = queue.Queue()
+    threading.Thread(target=ingestPayloads, args=(payloads, store, dictionaries), daemon=True).start()
+    # Partially received transfers are kept around even if the serial device has to be reopened, and the reassembler is
+    # shared between every radio so a transfer can come in over more than one of them
+    reassembler = TransferReassembler(lambda frame: None, nack_timeout=args.nack_timeout, check_payload=lambda payload: decodeScoutingPayload(payload, dictionaries))
 
+    ports = args.port
+    while len(ports) <= 0:
+        ports = findPorts()
+        if len(ports) <= 0:
+            print(f"Unable to find COM port for serial device...")
+            time.sleep(5)
 
+    readers = [threading.Thread(target=readPort, args=(port, args.baud, args.timeout, reassembler, payloads), daemon=True) for port in ports]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
 
 if __name__ == "__main__":
+    # The journal is flushed after every message, so nothing is lost by just exiting here
     signal.signal(signal.SIGINT, lambda x, y: sys.exit(0))
 
     main()
\ No newline at end of file
@@ -17,6 +17,11 @@ int counter = 0;
 String data = "";
 String serialEOF = "\xFF\x32\x84\xFF";
 
+// Has to match `_FRAME_MAGIC`/`_FRAME_NACK`/`_FRAME_ACK` in SenderSender.py
+#define FRAME_MAGIC 0xA6
+#define FRAME_NACK  0x02
+#define FRAME_ACK   0x03
+
 void setup() {
   Serial.begin(9600);
 
@@ -36,46 +41,60 @@ void setup() {
 }
 
 void loop() {
-  if(Serial.available() > 0) {
-    // This pretty much builds up the packet until the data ends with the standard EOF
-    while(Serial.available()) {
-      data += ((char)Serial.read());
+  readSerial();
+
+  // Every frame from the client ends with the EOF and always fits in a single packet, so each one goes out on its own
+  int eofIdx = data.indexOf(serialEOF);
+  if(eofIdx != -1 || data.length() >= 128) {
+    int packetLength = eofIdx != -1 ? min(eofIdx + (int)serialEOF.length(), 128) : 128;
+
+    LoRa.beginPacket();
+    for(int i = 0; i < packetLength; i++) {
+      LoRa.write(data.charAt(i));
+    }
+    LoRa.endPacket();
+    data.remove(0, packetLength);
+
+    // Hand a credit back so the client can send the next frame while this one is still settling
+    // NOTE: Nothing else (like debug prints) should be written here, the client parses everything up to this EOF.
+    Serial.write("\xFF\x32\x84\xFF");
+
+    // Listen for ACK/NACK frames from the receiver (and keep buffering frames) instead of just sitting in delay(500)
+    unsigned long sentAt = millis();
+    while(millis() - sentAt < 500) {
+      readSerial();
+      forwardLoRaPackets();
     }
   }
 
-  if(data.length() >= 128 || data.indexOf(serialEOF) != -1) {
-    Serial.print("Received data :: Length: ");
-    Serial.print(data.length());
-
-    int dataIdx = 0;
-    int split_count = (data.length() / 128) + (data.length() % 128 > 1 ? 1 : 0);
-
-    for(int packet_count = 0; packet_count < split_count; packet_count++) { 
-      Serial.print("Transmitting packet #");
-      Serial.println(packet_count);
-        
-      LoRa.beginPacket();
-        
-      for(int i = 0; i < 128; i++) {
-        if(dataIdx < data.length()) {
-          LoRa.write(data.charAt(dataIdx));
-          dataIdx++;
-        }
+  forwardLoRaPackets();
+}
+
+// Buffers whatever the client has written so far, the client never has more than a few frames outstanding
+void readSerial() {
+  while(Serial.available()) {
+    data += ((char)Serial.read());
+  }
+}
+
+// Relays ACK/NACK frames from the receiver to the client over serial
+// Other stations' data frames on the same channel get dropped here, the client would otherwise have to sort them out
+// of its credits (and they'd just be using up serial bandwidth).
+void forwardLoRaPackets() {
+  int packetSize = LoRa.parsePacket();
+  if(packetSize) {
+    uint8_t packet[256];
+    int length = 0;
+    while(LoRa.available()) {
+      uint8_t value = LoRa.read();
+      if(length < (int)sizeof(packet)) {
+        packet[length++] = value;
       }
-        
-      LoRa.endPacket();
-        
-      delay(500);      
     }
-    Serial.println(data);
-    data = "";
 
-    // Clear the serial data
-    while(Serial.available()) {
-      Serial.read();
+    // Frame magic followed by the frame type (neither of them ever gets escaped)
+    if(length >= 2 && packet[0] == FRAME_MAGIC && (packet[1] == FRAME_NACK || packet[1] == FRAME_ACK)) {
+      Serial.write(packet, length);
     }
-
-    // Send some data back to the serial port so the client knows it exists
-    Serial.write("\xFF\x32\x84\xFF");
   }
 }
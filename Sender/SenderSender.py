@@ -5,72 +5,964 @@ import traceback
 import logging
 import json
 import threading
+import queue
+import socket
 import serial
 import hashlib
+import heapq
+import random
+import struct
+import binascii
+import math
+import zlib
+import re
+import itertools
+import contextlib
+import http.server
 import serial.tools.list_ports
-from typing import Any, Dict, List, Union
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 from ppadb.client import Client as AdbClient
+from ppadb.device import Device
 
-_ARGUMENTS_PROMPT = f"Enter a command to run\n\t- `send`: Send the data to the LoRa to send to the pits\n\t- `save`: Save the full scouting data for importing onto the receiver station.\n\t- `wipe`: Wipe all cached device data\n\t- `clear`: Clear all total known event data\n\t- `exit`: Exit the scouting program...\n"
+# Every control API request has to have this header. Browsers can't add custom headers to a cross-site request without
+# a CORS preflight (which the control API never allows), so web pages open on the laptop can't trigger commands.
+_CONTROL_HEADER = "X-Radio-Scouter"
+_ARGUMENTS_PROMPT = f"Enter a command to run\n\t- `send`: Send the data to the LoRa to send to the pits\n\t- `save`: Save the full scouting data for importing onto the receiver station.\n\t- `wipe`: Wipe all cached device data\n\t- `clear`: Clear all total known event data\n\t- `train-dictionary`: Train the compression dictionary from the saved scouting history\n\t- `stats`: Show how long each stage has been taking\n\t- `exit`: Exit the scouting program...\n"
 _SCOUTING_EOF = b"\xFF\x32\x84\xFF"
 
+# The binary payload starts with a byte that can never start a JSON document so the receiver can tell them apart.
+_BINARY_PAYLOAD_MAGIC = 0xB5
+_BINARY_PAYLOAD_VERSION = 1
+
+# Digests (per-team scout counts and metric totals) go out ahead of the full scouts, they start with their own magic.
+_DIGEST_PAYLOAD_MAGIC = 0xD6
+_DIGEST_PAYLOAD_VERSION = 1
+# Stopwatches get sent as comma separated lap times
+_STOPWATCH_PATTERN = re.compile(r"^\d+(?:\.\d+)?(?:,\d+(?:\.\d+)?)*$")
+
+# Queued frames with a lower priority get written first, so a digest can jump ahead of the last send's full scouts.
+_PRIORITY_DIGEST = 0
+_PRIORITY_DETAILS = 1
+# A digest only goes out if it's at most this fraction of the full scouts. With only a match or two per team the digest
+# ends up about as big as the scouts themselves, so it would just double the airtime.
+_DIGEST_MAX_RATIO = 0.5
+# Only the most recent failed transfers get listed in a digest, the receiver expires anything older on its own anyway
+_MAX_SUPERSEDED = 32
+
+# Each metric gets a column type that is picked based on every value that is being sent for it.
+_COLUMN_BOOL = 0
+_COLUMN_UINT = 1
+_COLUMN_SINT = 2
+_COLUMN_STRING = 3
+_COLUMN_ANY = 4
+# Flag on the column type for metrics that were scouted but aren't in the template.
+_COLUMN_UNLISTED = 0x80
+
+# Tags used for the values inside of `_COLUMN_ANY` columns (and stopwatch lists).
+_VALUE_NULL = 0
+_VALUE_FALSE = 1
+_VALUE_TRUE = 2
+_VALUE_INT = 3
+_VALUE_FLOAT = 4
+_VALUE_STRING = 5
+_VALUE_LIST = 6
+
+# Compressed payloads are raw deflate streams, optionally primed with a dictionary trained on old scouting data.
+# Layout: magic, dictionary ID (CRC-32 of the dictionary, 0 when there isn't one), deflate stream
+_COMPRESSED_PAYLOAD_MAGIC = 0xC7
+_DICTIONARY_ID = struct.Struct(">I")
+# zlib can only look back 32KB, but our payloads are tiny so a smaller dictionary does the job
+_DEFAULT_DICTIONARY_SIZE = 8192
+
+# The EOF marker and the NUL byte can't show up inside of a frame, so they get escaped before being sent.
+_WIRE_ESCAPED_BYTES = (0x00, 0xFE, 0xFF)
+
+# Every payload is split into frames that each fit into a single LoRa packet (EOF included).
+# Frame layout (before escaping): magic, frame type, station ID, transfer ID, sequence number, frame count, body..., CRC-16
+# The station ID keeps transfers from different scouting stations apart when they share a channel.
+# Frames got a station ID after 0xA5, the magic changed so older frames get dropped instead of misread
+_FRAME_MAGIC = 0xA6
+_FRAME_DATA = 0x01
+_FRAME_NACK = 0x02
+_FRAME_ACK = 0x03
+_FRAME_HEADER = struct.Struct(">BBHHHH")
+_FRAME_CRC = struct.Struct(">H")
+_MAX_FRAME_SIZE = 128
+# Worst case, every header/CRC byte needs to be escaped
+_MAX_FRAME_BODY_SIZE = _MAX_FRAME_SIZE - len(_SCOUTING_EOF) - 2 * (_FRAME_HEADER.size + _FRAME_CRC.size)
+
+def _escapeWireBytes(data: bytes) -> bytes:
+    """Escapes 0xFE, 0xFF and 0x00 so a frame can never contain the EOF marker (or a NUL for the Arduino strings)."""
+    return data.replace(b"\xFE", b"\xFE\x01").replace(b"\xFF", b"\xFE\x02").replace(b"\x00", b"\xFE\x03")
+
+def _unescapeWireBytes(data: bytes) -> bytes:
+    """Reverses `_escapeWireBytes`. 0xFE is only ever sent as an escape, so the order here is safe."""
+    return data.replace(b"\xFE\x02", b"\xFF").replace(b"\xFE\x03", b"\x00").replace(b"\xFE\x01", b"\xFE")
+
+def _buildFrame(frame_type: int, station_id: int, transfer_id: int, sequence: int, total: int, body: bytes = b"") -> bytes:
+    frame = _FRAME_HEADER.pack(_FRAME_MAGIC, frame_type, station_id, transfer_id, sequence, total) + body
+    return _escapeWireBytes(frame + _FRAME_CRC.pack(binascii.crc_hqx(frame, 0xFFFF))) + _SCOUTING_EOF
+
+def _parseFrame(segment: bytes):
+    """Parses one EOF-terminated segment (minus the EOF) into (type, station ID, transfer ID, sequence, total, body).
+
+    Anything in front of the frame magic (e.g. debug prints from the Arduino) is skipped. Returns None if there
+    isn't a frame in the segment or if the CRC doesn't match.
+    """
+    start = segment.find(bytes([_FRAME_MAGIC]))
+    if start < 0:
+        return None
+    frame = _unescapeWireBytes(segment[start:])
+    if len(frame) < _FRAME_HEADER.size + _FRAME_CRC.size:
+        return None
+    (crc,) = _FRAME_CRC.unpack(frame[-_FRAME_CRC.size:])
+    if binascii.crc_hqx(frame[:-_FRAME_CRC.size], 0xFFFF) != crc:
+        return None
+    _, frame_type, station_id, transfer_id, sequence, total = _FRAME_HEADER.unpack(frame[:_FRAME_HEADER.size])
+    return frame_type, station_id, transfer_id, sequence, total, frame[_FRAME_HEADER.size:-_FRAME_CRC.size]
+
+def _buildDataFrames(payload: bytes, station_id: int, transfer_id: int) -> List[bytes]:
+    """Splits the payload into as few data frames as possible while keeping every escaped frame within one LoRa packet."""
+    bodies: List[bytes] = []
+    start = 0
+    while start < len(payload):
+        end = start
+        escaped_size = 0
+        while end < len(payload):
+            byte_size = 2 if payload[end] in _WIRE_ESCAPED_BYTES else 1
+            if escaped_size + byte_size > _MAX_FRAME_BODY_SIZE:
+                break
+            escaped_size += byte_size
+            end += 1
+        bodies.append(payload[start:end])
+        start = end
+
+    return [_buildFrame(_FRAME_DATA, station_id, transfer_id, sequence, len(bodies), body) for sequence, body in enumerate(bodies)]
+
+def defaultStationId() -> int:
+    """Every laptop gets its own station ID (from its hostname) unless one is passed in."""
+    return zlib.crc32(socket.gethostname().encode('utf-8')) & 0xFFFF
+
+def estimateAirtime(payload_size: int, spreading_factor: int = 7, bandwidth: float = 125E3, coding_rate: int = 5, preamble_length: int = 8, crc: bool = True) -> float:
+    """Time on air (in seconds) for one LoRa packet, using the formula from Semtech's SX1276 datasheet.
+
+    The defaults match the arduino-LoRa defaults that `Sender.ino` runs with (SF7, 125kHz, 4/5, explicit header, CRC on).
+    """
+    symbol_time = (2 ** spreading_factor) / bandwidth
+    # The radio turns on low data rate optimization by itself once symbols get longer than 16ms
+    low_data_rate = 1 if symbol_time > 0.016 else 0
+    payload_symbols = 8 + max(math.ceil((8 * payload_size - 4 * spreading_factor + 28 + 16 * int(crc)) / (4 * (spreading_factor - 2 * low_data_rate))) * coding_rate, 0)
+    return (preamble_length + 4.25) * symbol_time + payload_symbols * symbol_time
+
+def dictionaryId(dictionary: Optional[bytes]) -> int:
+    return zlib.crc32(dictionary) if dictionary else 0
+
+def compressPayload(payload: bytes, dictionary: Optional[bytes] = None) -> bytes:
+    """Deflates the payload (with the shared dictionary if there is one), the receiver looks the dictionary up by its ID."""
+    if dictionary:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9)
+    return bytes([_COMPRESSED_PAYLOAD_MAGIC]) + _DICTIONARY_ID.pack(dictionaryId(dictionary)) + compressor.compress(payload) + compressor.flush()
+
+def trainDictionary(samples: List[bytes], size: int = _DEFAULT_DICTIONARY_SIZE, segment_size: int = 32, kmer_size: int = 6) -> bytes:
+    """Builds a compression dictionary out of the segments that show up in the most samples.
+
+    This is a stripped down version of the COVER algorithm that zstd uses: every k-mer is scored by how many samples it
+    shows up in, and segments are greedily picked by the score of the k-mers they cover that haven't been covered yet.
+    """
+    def kmers(segment: bytes):
+        return {segment[i:i + kmer_size] for i in range(len(segment) - kmer_size + 1)}
+
+    frequencies: Counter = Counter()
+    candidates = set()
+    for sample in samples:
+        frequencies.update(kmers(sample))
+        for start in range(0, max(len(sample) - segment_size, 0) + 1, kmer_size):
+            candidates.add(sample[start:start + segment_size])
+
+    def score(segment: bytes, covered: set) -> int:
+        # K-mers that only show up in one sample won't help compress anything else
+        return sum(frequencies[kmer] for kmer in kmers(segment) - covered if frequencies[kmer] > 1)
+
+    covered: set = set()
+    heap = [(-score(segment, covered), segment) for segment in candidates]
+    heapq.heapify(heap)
+
+    chosen: List[bytes] = []
+    total_size = 0
+    while heap and total_size < size:
+        _, segment = heapq.heappop(heap)
+        current_score = score(segment, covered)
+        if current_score <= 0:
+            continue
+        # Scores only ever go down, so if this is still the best it's safe to pick it without rescoring the rest
+        if heap and current_score < -heap[0][0]:
+            heapq.heappush(heap, (-current_score, segment))
+            continue
+        chosen.append(segment)
+        covered |= kmers(segment)
+        total_size += len(segment)
+
+    # Deflate matches are cheaper the closer they are, so the most useful segments go at the end
+    return b"".join(reversed(chosen))[-size:]
+
+def _writeVarint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _writeZigZag(buffer: bytearray, value: int):
+    _writeVarint(buffer, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+def _writeString(buffer: bytearray, value: str):
+    encoded = value.encode('utf-8')
+    _writeVarint(buffer, len(encoded))
+    buffer += encoded
+
+def _writeTaggedValue(buffer: bytearray, value: Any):
+    if value is None:
+        buffer.append(_VALUE_NULL)
+    elif isinstance(value, bool):
+        buffer.append(_VALUE_TRUE if value else _VALUE_FALSE)
+    elif isinstance(value, int):
+        buffer.append(_VALUE_INT)
+        _writeZigZag(buffer, value)
+    elif isinstance(value, float):
+        buffer.append(_VALUE_FLOAT)
+        buffer += struct.pack("<d", value)
+    elif isinstance(value, str):
+        buffer.append(_VALUE_STRING)
+        _writeString(buffer, value)
+    elif isinstance(value, list):
+        buffer.append(_VALUE_LIST)
+        _writeVarint(buffer, len(value))
+        for item in value:
+            _writeTaggedValue(buffer, item)
+    else:
+        raise ValueError(f"Unable to binary encode metric value of type {type(value).__name__}")
+
+def _inferColumnType(values: List[Any]) -> int:
+    """Picks the smallest column type that can hold every value a metric has in this payload."""
+    if len(values) > 0 and all(isinstance(v, bool) for v in values):
+        return _COLUMN_BOOL
+    if len(values) > 0 and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return _COLUMN_UINT if all(v >= 0 for v in values) else _COLUMN_SINT
+    if len(values) > 0 and all(isinstance(v, str) for v in values):
+        return _COLUMN_STRING
+    return _COLUMN_ANY
+
+def encodeScoutingData(combinedScoutingData: Dict[str, Any]) -> bytes:
+    """Encodes the combined scouting data into the compact binary format decoded by `ReceiverReceiver.py`.
+
+    Layout (all counts/lengths are varints):
+        magic, version, column count, [column type, metric id, metric name]...,
+        team count, [team, scout count, [presence bitmap, boolean bitmap, values...]...]...
+    """
+    template: Dict[str, str] = combinedScoutingData.get('template', {})
+    teams: Dict[str, List[Dict[str, Any]]] = combinedScoutingData.get('teams', {})
+
+    # Give every metric a small integer ID (its column index), template metrics first so they stay in order.
+    metric_ids: List[str] = list(template.keys())
+    metric_values: Dict[str, List[Any]] = {metric_id: [] for metric_id in metric_ids}
+    for scouts in teams.values():
+        for scout in scouts:
+            for metric_id, value in scout.items():
+                if metric_id not in metric_values:
+                    metric_ids.append(metric_id)
+                    metric_values[metric_id] = []
+                metric_values[metric_id].append(value)
+
+    column_types = [_inferColumnType(metric_values[metric_id]) for metric_id in metric_ids]
+    column_indexes = {metric_id: idx for idx, metric_id in enumerate(metric_ids)}
+    bitmap_size = (len(metric_ids) + 7) // 8
+
+    buffer = bytearray([_BINARY_PAYLOAD_MAGIC, _BINARY_PAYLOAD_VERSION])
+    _writeVarint(buffer, len(metric_ids))
+    for metric_id, column_type in zip(metric_ids, column_types):
+        buffer.append(column_type if metric_id in template else column_type | _COLUMN_UNLISTED)
+        _writeString(buffer, metric_id)
+        _writeString(buffer, template.get(metric_id, ""))
+
+    _writeVarint(buffer, len(teams))
+    for team, scouts in teams.items():
+        # Team numbers are sent as numbers (shifted left one bit), anything else is sent as a string (low bit set).
+        if team.isdigit() and str(int(team)) == team:
+            _writeVarint(buffer, int(team) << 1)
+        else:
+            encoded_team = team.encode('utf-8')
+            _writeVarint(buffer, (len(encoded_team) << 1) | 1)
+            buffer += encoded_team
+
+        _writeVarint(buffer, len(scouts))
+        for scout in scouts:
+            present = sorted(column_indexes[metric_id] for metric_id in scout.keys())
+            presence = bytearray(bitmap_size)
+            for idx in present:
+                presence[idx >> 3] |= 1 << (idx & 7)
+            buffer += presence
+
+            # Booleans are packed 8 to a byte, everything else follows in column order.
+            booleans = [bool(scout[metric_ids[idx]]) for idx in present if column_types[idx] == _COLUMN_BOOL]
+            packed_booleans = bytearray((len(booleans) + 7) // 8)
+            for bit, value in enumerate(booleans):
+                if value:
+                    packed_booleans[bit >> 3] |= 1 << (bit & 7)
+            buffer += packed_booleans
+
+            for idx in present:
+                value = scout[metric_ids[idx]]
+                column_type = column_types[idx]
+                if column_type == _COLUMN_UINT:
+                    _writeVarint(buffer, value)
+                elif column_type == _COLUMN_SINT:
+                    _writeZigZag(buffer, value)
+                elif column_type == _COLUMN_STRING:
+                    _writeString(buffer, value)
+                elif column_type == _COLUMN_ANY:
+                    _writeTaggedValue(buffer, value)
+
+    return bytes(buffer)
+
+def templateFingerprint(template: Dict[str, str]) -> int:
+    """CRC-32 of the template, digests refer to metrics by their index in the template (sorted by metric ID)."""
+    return zlib.crc32(json.dumps(sorted(template.items()), separators=(',', ':')).encode('utf-8'))
+
+def buildDigest(combinedScoutingData: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Per team: how many scouts there are and [count, sum, max] of every number, boolean and stopwatch lap."""
+    digest: Dict[str, Dict[str, Any]] = {}
+    for team, scouts in combinedScoutingData.get('teams', {}).items():
+        metrics: Dict[str, List[Union[int, float]]] = {}
+        for scout in scouts:
+            for metric_id, value in scout.items():
+                if isinstance(value, (bool, int, float)):
+                    values = [int(value) if isinstance(value, bool) else value]
+                elif isinstance(value, list):
+                    values = [lap for lap in value if isinstance(lap, (int, float)) and not isinstance(lap, bool)]
+                elif isinstance(value, str) and _STOPWATCH_PATTERN.match(value):
+                    values = [float(lap) if "." in lap else int(lap) for lap in value.split(",")]
+                else:
+                    continue
+                if len(values) <= 0:
+                    continue
+                if metric_id not in metrics:
+                    metrics[metric_id] = [0, 0, values[0]]
+                aggregate = metrics[metric_id]
+                aggregate[0] += len(values)
+                aggregate[1] += sum(values)
+                aggregate[2] = max(aggregate[2], *values)
+        digest[team] = { "scouts": len(scouts), "metrics": metrics }
+    return digest
+
+def encodeDigest(digest: Dict[str, Dict[str, Any]], template: Dict[str, str], details_transfer_id: int, superseded: List[int] = [], include_template: bool = True) -> bytes:
+    """Encodes a digest from `buildDigest` for `ReceiverReceiver.py`.
+
+    Layout (all counts/lengths are varints):
+        magic, version, details transfer ID (u16), template fingerprint (u32), superseded count, [transfer ID (u16)]...,
+        template metric count (0 when it's left out), [metric id, metric name]...,
+        team count, [team, scout count, metric count, [metric index, count, sum, max]...]...
+    Metrics are referred to by their index in the template, so the template only has to be included until the receiver
+    has acknowledged a digest with it. Superseded transfers are earlier full scouts that never made it (they're part of
+    this send instead).
+    """
+    metric_ids = sorted(template.keys())
+    metric_indexes = {metric_id: idx for idx, metric_id in enumerate(metric_ids)}
+
+    buffer = bytearray([_DIGEST_PAYLOAD_MAGIC, _DIGEST_PAYLOAD_VERSION])
+    buffer += struct.pack(">HI", details_transfer_id, templateFingerprint(template))
+    _writeVarint(buffer, len(superseded))
+    for transfer_id in superseded:
+        buffer += struct.pack(">H", transfer_id)
+
+    _writeVarint(buffer, len(metric_ids) if include_template else 0)
+    if include_template:
+        for metric_id in metric_ids:
+            _writeString(buffer, metric_id)
+            _writeString(buffer, template[metric_id])
+
+    _writeVarint(buffer, len(digest))
+    for team, team_digest in digest.items():
+        _writeString(buffer, team)
+        _writeVarint(buffer, team_digest["scouts"])
+        metrics = [(metric_indexes[metric_id], aggregate) for metric_id, aggregate in team_digest["metrics"].items() if metric_id in metric_indexes]
+        _writeVarint(buffer, len(metrics))
+        for idx, (count, total, maximum) in metrics:
+            _writeVarint(buffer, idx)
+            _writeVarint(buffer, count)
+            _writeTaggedValue(buffer, total)
+            _writeTaggedValue(buffer, maximum)
+
+    return bytes(buffer)
+
+class ScoutHashIndex:
+    """A set of canonical-JSON digests for scouts that have already been handled, so dedup doesn't rehash everything."""
+
+    def __init__(self, digests: List[str] = []):
+        self.digests = set(digests)
+
+    @staticmethod
+    def digest(scout: Dict[str, Any], team: Optional[str] = None) -> str:
+        # Sorting the keys makes the digest independent of whatever order the metrics came out of the export in
+        canonical = json.dumps(scout if team is None else [team, scout], sort_keys=True, separators=(',', ':'))
+        return hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
+    def add(self, scout_digest: str) -> bool:
+        """Adds the digest and returns whether it was new."""
+        if scout_digest in self.digests:
+            return False
+        self.digests.add(scout_digest)
+        return True
+
+    def discard(self, scout_digest: str):
+        self.digests.discard(scout_digest)
+
+    def clear(self):
+        self.digests.clear()
+
+    def toList(self) -> List[str]:
+        return list(self.digests)
+
+    def __contains__(self, scout_digest: str) -> bool:
+        return scout_digest in self.digests
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+class StageStats:
+    """Thread-safe timings/counters for each stage of the pipeline, optionally written out to a metrics JSON file."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Union[int, float]] = {}
+        self._stop_event = threading.Event()
+        self.writer: Optional[threading.Thread] = None
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            timing = self.stages.setdefault(stage, { "count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0 })
+            timing["count"] += 1
+            timing["total_seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+            timing["last_seconds"] = seconds
+
+    @contextlib.contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def increment(self, counter: str, amount: int = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def gauge(self, name: str, value: Union[int, float]):
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "stages": {
+                    stage: {
+                        "count": int(timing["count"]),
+                        "total_seconds": round(timing["total_seconds"], 6),
+                        "mean_seconds": round(timing["total_seconds"] / timing["count"], 6),
+                        "max_seconds": round(timing["max_seconds"], 6),
+                        "last_seconds": round(timing["last_seconds"], 6),
+                    } for stage, timing in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def write(self, path: str):
+        # Write to a temporary file first so anything watching the metrics file never reads half of it
+        with open(path + ".tmp", "w+") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    def startWriting(self, path: str, interval: float = 10.0):
+        """Rewrites the metrics file every `interval` seconds until `stopWriting` is called."""
+        def writeLoop():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.write(path)
+                except OSError:
+                    traceback.print_exc()
+            self.write(path)
+
+        self.writer = threading.Thread(target=writeLoop, daemon=True)
+        self.writer.start()
+
+    def stopWriting(self):
+        self._stop_event.set()
+        if self.writer is not None:
+            self.writer.join(timeout=5)
+
+# Shared by every thread in here, see the `stats` command
+_stats = StageStats()
+
+class SerialTransport(threading.Thread):
+    """One LoRa sender radio: keeps its serial port open and streams whatever frames get queued up for it.
+
+    `Sender.ino` writes an EOF back every time it puts a frame on the air, and each of those is a credit for one more
+    frame. Up to `window` frames can be waiting on the board at once, so the serial hop never has to wait on a round
+    trip per frame (the board only has so much RAM though, so keep the window small). Queued frames go out by priority
+    (lowest first), then in the order they were queued. Control frames relayed back from the receiver get handed over
+    to `on_control`.
+    """
+
+    def __init__(self, port: str, on_control: Callable[[Tuple[int, int, int, int, int, bytes]], None], baud: int = 9600, timeout: float = 15.0, window: int = 4, spreading_factor: int = 7):
+        super().__init__(daemon=True)
+        self.port = port
+        self.on_control = on_control
+        self.baud = baud
+        self.timeout = timeout
+        self.window = max(1, window)
+        self.spreading_factor = spreading_factor
+
+        # (priority, order, transfer ID, frame) heap of frames that haven't been written yet
+        self.frames: List[Tuple[int, int, int, bytes]] = []
+        self.frames_ready = threading.Condition()
+        self.serial_device: Optional[serial.Serial] = None
+        self.buffer = bytearray()
+        # Frames the board hasn't given a credit back for yet, this carries over between transfers
+        self.in_flight = 0
+        # Last time anything was written to or heard from the board
+        self.last_active = time.monotonic()
+        # Set while the port can't be opened (unplugged, etc)
+        self.failed = False
+        # Total (estimated) airtime of every frame sent so far, for the auto sender's airtime budget
+        self.airtime_used = 0.0
+        self._stop_event = threading.Event()
+
+    def open(self) -> serial.Serial:
+        """Returns the open serial device, only opening it when it isn't open already."""
+        if self.serial_device is None or not self.serial_device.is_open:
+            print(f"Opening LoRa sender on port: '{self.port}'...")
+            with _stats.timed("serial_open"):
+                # A short timeout so control frames still get read while there's nothing to send
+                self.serial_device = serial.Serial(self.port, self.baud, timeout=0.25)
+            self.buffer.clear()
+            self.in_flight = 0
+            self.failed = False
+        return self.serial_device
+
+    def close(self):
+        if self.serial_device is not None:
+            self.serial_device.close()
+        self.serial_device = None
+
+    def _writeFrame(self, serial_device: serial.Serial, frame: bytes):
+        with _stats.timed("serial_write"):
+            serial_device.write(frame)
+        self.airtime_used += estimateAirtime(len(frame), self.spreading_factor)
+        self.in_flight += 1
+        self.last_active = time.monotonic()
+
+    def _poll(self, serial_device: serial.Serial):
+        """Reads whatever the board has written back, every bare EOF is a credit and ACK/NACK frames go to `on_control`."""
+        self.buffer += serial_device.read(max(1, serial_device.in_waiting))
+        while True:
+            eof_idx = self.buffer.find(_SCOUTING_EOF)
+            if eof_idx < 0:
+                break
+            segment = bytes(self.buffer[:eof_idx])
+            del self.buffer[:eof_idx + len(_SCOUTING_EOF)]
+            self.last_active = time.monotonic()
+            frame = _parseFrame(segment)
+            if frame is not None and frame[0] in (_FRAME_ACK, _FRAME_NACK):
+                self.on_control(frame)
+            elif frame is None and bytes([_FRAME_MAGIC]) not in segment:
+                # A bare EOF is a credit, anything in front of it is text the board printed (like its startup banner)
+                self.in_flight = max(0, self.in_flight - 1)
+            else:
+                # Another station's data frame relayed by an older `Sender.ino` (or a mangled frame), it isn't a credit
+                _stats.increment("frames_ignored")
+
+        if self.in_flight > 0 and time.monotonic() - self.last_active > self.timeout:
+            # The board hands a credit back for every frame, so if it's gone quiet those credits aren't coming
+            print(f"LoRa sender on '{self.port}' stopped responding...")
+            self.in_flight = 0
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                serial_device = self.open()
+                _stats.gauge(f"frames_in_flight[{self.port}]", self.in_flight)
+                if self.in_flight < self.window and serial_device.in_waiting <= 0:
+                    # Only block on the queue when the board doesn't owe us anything
+                    frame = self._nextFrame(0.25 if self.in_flight <= 0 else 0.01)
+                    if frame is not None:
+                        self._writeFrame(serial_device, frame)
+                        continue
+                self._poll(serial_device)
+            except (serial.SerialException, OSError):
+                # Most likely unplugged, keep trying to open it again
+                if not self.failed:
+                    traceback.print_exc()
+                self.failed = True
+                self.close()
+                self._stop_event.wait(1.0)
+        self.close()
+
+    def queueFrame(self, frame: bytes, transfer_id: int, priority: int, order: int):
+        with self.frames_ready:
+            heapq.heappush(self.frames, (priority, order, transfer_id, frame))
+            self.frames_ready.notify()
+
+    def _nextFrame(self, timeout: float) -> Optional[bytes]:
+        with self.frames_ready:
+            if len(self.frames) <= 0:
+                self.frames_ready.wait(timeout)
+            if len(self.frames) <= 0:
+                return None
+            return heapq.heappop(self.frames)[3]
+
+    def queued(self) -> int:
+        return len(self.frames)
+
+    def clear(self, transfer_id: Optional[int] = None):
+        """Drops frames that haven't been written yet, only the ones from `transfer_id` when it's given."""
+        with self.frames_ready:
+            self.frames = [entry for entry in self.frames if transfer_id is not None and entry[2] != transfer_id]
+            heapq.heapify(self.frames)
+
+    def stop(self):
+        self._stop_event.set()
+
+class RadioPool:
+    """Every LoRa sender radio that's plugged in, transfers get split between all of them.
+
+    Each radio has its own queue and thread, and frames go to whichever radio has the least waiting on it. The receiver
+    reassembles frames no matter which radio they came through. Each sender/receiver pair has to be on its own channel.
+
+    More than one transfer can be in progress at once: every transfer waits on its own ACK/NACKs, and higher priority
+    transfers (digests) get their frames written ahead of anything lower priority that's still queued up.
+    """
+
+    def __init__(self, ports: List[str] = [], baud: int = 9600, timeout: float = 15.0, window: int = 4, spreading_factor: int = 7, find_timeout: float = 30.0):
+        # Finds every Feather 32u4 on its own when this is empty, a send fails if none show up within `find_timeout`
+        self.ports = ports
+        self.find_timeout = find_timeout
+        self.baud = baud
+        self.timeout = timeout
+        self.window = window
+        self.spreading_factor = spreading_factor
+        self.radios: Dict[str, SerialTransport] = {}
+        # (station ID, transfer ID) -> (frame type, body) of the control frames for a transfer that's still in progress
+        self.transfers: Dict[Tuple[int, int], "queue.Queue[Tuple[int, bytes]]"] = {}
+        self.lock = threading.Lock()
+        # Held while radios are being found/started, so looking for ports doesn't hold up control frames
+        self.radio_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Keeps frames with the same priority in the order they were queued, across every radio
+        self.order = itertools.count()
+        # Transfers wait on their ACK in here, so a send doesn't have to wait on the last one's full scouts
+        self.waiters = ThreadPoolExecutor(max_workers=4)
+
+    @property
+    def airtime_used(self) -> float:
+        return sum(radio.airtime_used for radio in list(self.radios.values()))
+
+    def _findPorts(self) -> List[str]:
+        if len(self.ports) > 0:
+            return self.ports
+
+        print(f"Finding LoRa serial devices...")
+        # Now we need to send the JSON data to the serial devices connected (LoRa Senders).
+        ports = []
+        deadline = time.monotonic() + self.find_timeout
+        while len(ports) <= 0:
+            # Make sure to ignore Android/SAMSUNG devices... 
+            ports = [port for port in serial.tools.list_ports.comports() if "Feather 32u4" in str(port)]
+            if len(ports) <= 0:
+                if time.monotonic() >= deadline:
+                    print(f"No LoRa serial devices found...")
+                    break
+                if self._stop_event.wait(1):
+                    break
+        return sorted(port.device for port in ports)
+
+    def _startRadios(self):
+        """Picks up any radios that got plugged in, the ones that are already running keep their ports open."""
+        if self._stop_event.is_set():
+            return
+        if len(self.radios) > 0 and (len(self.ports) > 0 or not any(radio.failed for radio in self.radios.values())):
+            return
+        for port in self._findPorts():
+            if port not in self.radios:
+                print(f"Detected serial device on port: '{port}'...")
+                self.radios[port] = SerialTransport(port, self._dispatchControl, self.baud, self.timeout, self.window, self.spreading_factor)
+                self.radios[port].start()
+        _stats.gauge("radios", len(self.radios))
+
+    def _dispatchControl(self, frame: Tuple[int, int, int, int, int, bytes]):
+        frame_type, station_id, transfer_id, _, _, body = frame
+        with self.lock:
+            controls = self.transfers.get((station_id, transfer_id))
+        # Anything else is meant for another station on the same channel (or an old transfer)
+        if controls is not None:
+            controls.put((frame_type, body))
+
+    def _queueFrames(self, frames: List[bytes], sequences: List[int], sent: Set[int], transfer_id: int, priority: int):
+        radios = [radio for radio in self.radios.values() if not radio.failed] or list(self.radios.values())
+        if len(radios) <= 0:
+            # Closed while the transfer was still going
+            return
+        for sequence in sequences:
+            _stats.increment("frames_resent" if sequence in sent else "frames_sent")
+            sent.add(sequence)
+            print(f"\t[{sequence}] Sending frame...")
+            min(radios, key=lambda radio: radio.queued() + radio.in_flight).queueFrame(frames[sequence], transfer_id, priority, next(self.order))
+
+    def _busy(self) -> bool:
+        """Whether any working radio still has frames to send (or credits it's waiting on)."""
+        now = time.monotonic()
+        return any(not radio.failed and (radio.queued() > 0 or now - radio.last_active < self.timeout) for radio in self.radios.values())
+
+    def submit(self, frames: List[bytes], station_id: int, transfer_id: int, priority: int = _PRIORITY_DETAILS, retries: int = 5) -> "Future[bool]":
+        """Queues up every frame of a transfer, the returned future resolves once the receiver ACKs it (or it gets given up on)."""
+        controls: "queue.Queue[Tuple[int, bytes]]" = queue.Queue()
+        with self.radio_lock:
+            self._startRadios()
+            if len(self.radios) <= 0:
+                # Nothing plugged in (or closing), so there's nothing to wait on an ACK from
+                _stats.increment("sends_without_radios")
+                failed: "Future[bool]" = Future()
+                failed.set_result(False)
+                return failed
+        with self.lock:
+            self.transfers[(station_id, transfer_id)] = controls
+        sent: Set[int] = set()
+        self._queueFrames(frames, list(range(len(frames))), sent, transfer_id, priority)
+        return self.waiters.submit(self._awaitTransfer, frames, station_id, transfer_id, priority, retries, controls, sent)
+
+    def sendFrames(self, frames: List[bytes], station_id: int, transfer_id: int, priority: int = _PRIORITY_DETAILS, retries: int = 5) -> bool:
+        """Streams every frame of a transfer over every radio and then resends only the frames the receiver says are missing."""
+        return self.submit(frames, station_id, transfer_id, priority, retries).result()
+
+    def _awaitTransfer(self, frames: List[bytes], station_id: int, transfer_id: int, priority: int, retries: int, controls: "queue.Queue[Tuple[int, bytes]]", sent: Set[int]) -> bool:
+        attempts = 0
+        try:
+            while attempts <= retries:
+                try:
+                    frame_type, body = controls.get(timeout=0.25)
+                except queue.Empty:
+                    if self._busy():
+                        continue
+                    # Nothing came back, resending the last frame makes the receiver respond with an ACK/NACK again
+                    attempts += 1
+                    _stats.increment("response_timeouts")
+                    print(f"No response from the receiver for transfer #{transfer_id}, resending the last frame (attempt {attempts}/{retries})...")
+                    self._queueFrames(frames, [len(frames) - 1], sent, transfer_id, priority)
+                    continue
+
+                if frame_type == _FRAME_ACK:
+                    return True
+                if frame_type == _FRAME_NACK:
+                    missing = [sequence for (sequence,) in struct.iter_unpack(">H", body) if sequence < len(frames)]
+                    print(f"Receiver is missing {len(missing)} frame(s) of transfer #{transfer_id}, resending them...")
+                    _stats.increment("nacks_received")
+                    for radio in list(self.radios.values()):
+                        # Anything of this transfer that's still queued up is about to be sent again anyway
+                        radio.clear(transfer_id)
+                    self._queueFrames(frames, missing, sent, transfer_id, priority)
+                    attempts += 1
+            return False
+        finally:
+            with self.lock:
+                self.transfers.pop((station_id, transfer_id), None)
+            for radio in list(self.radios.values()):
+                radio.clear(transfer_id)
+
+    def close(self):
+        # Stops any send that's still looking for radios first, otherwise it'd be holding onto `radio_lock`
+        self._stop_event.set()
+        with self.radio_lock:
+            for radio in self.radios.values():
+                radio.stop()
+            for radio in self.radios.values():
+                radio.join(timeout=5)
+            self.radios = {}
+
 class BackgroundADBWatcher(threading.Thread):
     """A simple background task that monitors ADB devices on the USB and updates the scouting dictionary."""
 
-    perDeviceScoutingData: Dict[str, Dict[str, Dict[str, Any]]] = {}
     metricMapping: Dict[str, str] = {}
+    # Reverse of `metricMapping` (metric name -> metric ID)
+    metricIdsByName: Dict[str, str] = {}
 
-    def __init__(self, client: AdbClient, export_path: str, cache_path: str = "./scouting_cache.json"):
+    def __init__(self, client: AdbClient, export_path: str, cache_path: str = "./scouting_cache.json", encoding: str = "json", dictionary_path: str = "./scouting_dictionary.bin", training_paths: List[str] = [], poll_interval: float = 1.5, pull_workers: int = 8, serial_ports: List[str] = [], spreading_factor: int = 7, headless: bool = False, baud: int = 9600, window: int = 4, station_id: Optional[int] = None, digests: bool = True):
         super().__init__()
     
-        self.perDeviceScoutingData = {}
         self.client = client
         self.export_path = export_path
         self.cache_path = cache_path
+        self.encoding = encoding
+        self.dictionary_path = dictionary_path
+        self.training_paths = training_paths
+        # Serial ports stay open between sends, `serial_ports` skips looking for LoRa senders (e.g. ptys from `Benchmarks/SimulateLink.py`)
+        self.transport = RadioPool(serial_ports, baud, window=window, spreading_factor=spreading_factor)
+        # Nobody is around to answer prompts when running headless
+        self.headless = headless
+
+        self.dictionary: Optional[bytes] = None
+        if os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path, "rb") as f:
+                self.dictionary = f.read()
+            print(f"Loaded compression dictionary #{dictionaryId(self.dictionary):08x} ({len(self.dictionary)} bytes)")
+        # Transfer IDs only need to be unique for a little while, start at a random one so restarts don't collide.
+        self.transfer_id = random.randrange(0, 0x10000)
+        self.station_id = defaultStationId() if station_id is None else station_id & 0xFFFF
+        print(f"Sending as station #{self.station_id:04x}")
+        # Only one send can be merging/queueing at a time (the prompt, the auto sender and the control API can all send)
+        self.send_lock = threading.Lock()
+        # Send a digest ahead of the full scouts, the send returns once the digest is in and the rest goes in the background
+        self.digests = digests
+        # Fingerprint of the last template the receiver acknowledged (with a digest or the full scouts), digests can leave it out
+        self.digest_fingerprint: Optional[int] = None
+        # Full scout transfers that never made it since the last acknowledged digest, the receiver can drop their digests.
+        # Kept in scouting_cache.json so a restart doesn't forget about them.
+        self.superseded_transfers: List[int] = []
 
         self.event_lock = threading.Lock()
         self._stop_event = threading.Event()
 
-        self.cachedScoutingData: List[str] = []
+        # Devices come from ADB's track-devices stream, exports only get pulled when their size/mtime changes
+        self.poll_interval = poll_interval
+        self.pull_pool = ThreadPoolExecutor(max_workers=pull_workers)
+        self.device_lock = threading.Lock()
+        self.connectedDevices: Set[str] = set()
+        self.exportSignatures: Dict[str, str] = {}
+        self.tracking = False
+        self._devices_changed = threading.Event()
+        # Set whenever a pulled export has scouts that haven't been sent yet
+        self.new_scouts = threading.Event()
+
+        # Per device, per team: the newest scout timestamp seen and the last pulled copy of every scout (by timestamp).
+        # Only scouts past the watermark (or ones that got edited) are new, so those are the only ones that get queued.
+        self.deviceWatermarks: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # New/changed scouts waiting on the next send/save, as (team, raw scout, digest)
+        self.pendingSend: List[Tuple[str, Dict[str, Any], str]] = []
+        self.pendingSave: List[Tuple[str, Dict[str, Any], str]] = []
+
+        self.metricMapping = {}
+        self.metricIdsByName = {}
+
+        # Digests of every raw scout that has been sent already
+        self.cachedScoutingData = ScoutHashIndex()
         if os.path.exists(self.cache_path):
             with open(self.cache_path, "r") as f:
                 data = json.load(f)
-                self.cachedScoutingData = data['cache']
-                self.metricMapping = data['template']
+                self.cachedScoutingData = ScoutHashIndex(data['cache'])
+                self._updateMetricMapping(data['template'])
+                self.superseded_transfers = data.get('superseded', [])
+
+        # saved_scouts.json (and the digests of the scouts in it) only get loaded once, on the first save
+        self.saved_path = os.path.join(os.path.dirname(self.cache_path), "saved_scouts.json")
+        self.savedScoutingData: Optional[Dict[str, Any]] = None
+        self.savedIndex = ScoutHashIndex()
+
+    def _updateDevices(self, serials: Set[str]):
+        with self.device_lock:
+            for serial in serials - self.connectedDevices:
+                print(f"Discovered device: {serial}")
+            for serial in self.connectedDevices - serials:
+                print(f"Device disconnected: {serial}")
+                # Make sure the export gets checked again if it comes back
+                self.exportSignatures.pop(serial, None)
+            self.connectedDevices = serials
+        self._devices_changed.set()
+
+    def _trackDevices(self):
+        """Follows ADB's track-devices stream so connects/disconnects show up right away instead of on the next poll."""
+        while not self.stopped():
+            try:
+                with self.client.create_connection() as conn:
+                    conn.send("host:track-devices")
+                    self.tracking = True
+                    while not self.stopped():
+                        # Every message is the full list of devices, one `serial\tstate` per line
+                        lines = conn.receive().splitlines()
+                        self._updateDevices({line.split('\t')[0] for line in lines if line.endswith('\tdevice')})
+            except (RuntimeError, OSError, ValueError):
+                # ADB isn't running (or got restarted), `run` takes care of telling the user about it
+                pass
+            self.tracking = False
+            time.sleep(self.poll_interval)
+
+    def _pullExport(self, serial: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Pulls and parses a device's export, or returns None if it hasn't changed since the last pull."""
+        device = Device(self.client, serial)
+        # Checking the size/mtime is a lot cheaper than pulling the whole export every time
+        with _stats.timed(f"adb_check[{serial}]"):
+            signature = device.shell(f'stat -c "%s %y" \"{self.export_path}\" 2>&1').strip()
+        if self.exportSignatures.get(serial) == signature:
+            _stats.increment("exports_unchanged")
+            return None
+
+        with _stats.timed(f"adb_pull[{serial}]"):
+            result = device.shell(f'cat \"{self.export_path}\"').strip()
+        _stats.increment("exports_pulled")
+        _stats.increment("export_bytes_pulled", len(result))
+        try:
+            with _stats.timed("parse"):
+                return signature, json.loads(result)
+        except ValueError:
+            # json.loads(...) will throw a value error if the JSON is malformed or if the JSON doesn't exist
+            _stats.increment("exports_malformed")
+            return signature, None
 
     """Runs the task that monitors ADB devices"""
     def run(self, *args, **kwargs):
-        found_devices: List[str] = []
+        threading.Thread(target=self._trackDevices, daemon=True).start()
+
         while not self.stopped():
             try:
-                devices = self.client.devices()
+                if not self.tracking:
+                    # Fall back on polling the device list, this also surfaces ADB not running below
+                    self._updateDevices({device.serial for device in self.client.devices()})
 
-                with self.event_lock:
-                    for device in devices:
-                        # If we've already found the device, just skip printing info on it
-                        if device.serial not in found_devices:
-                            print(f"Discovered device: {device.serial}")
-                            found_devices.append(device.serial)
-
-                        result = device.shell(f'cat \"{self.export_path}\"').strip()
-                        
-                        # Make sure that we have the event lock so we can properly update the JSON
-                        try:
-                            self.perDeviceScoutingData.update({ device.serial : json.loads(result) })
-                        except ValueError:
-                            # json.loads(...) will throw a value error if the JSON is malformed or if the JSON doesn't exist
-                            continue
-                    # Remove the device if it gets disconnected
-                    for serial in found_devices:
-                        if serial not in [d.serial for d in devices]:
-                            found_devices.remove(serial)
-                
-                time.sleep(1.5)
+                with self.device_lock:
+                    serials = list(self.connectedDevices)
+                _stats.gauge("devices_connected", len(serials))
+
+                # Pull all of the changed exports at once and outside of the event lock so send/save don't have to wait
+                pulls = {self.pull_pool.submit(self._pullExport, serial): serial for serial in serials}
+                updates: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+                for pull in as_completed(pulls):
+                    try:
+                        result = pull.result()
+                    except Exception:
+                        traceback.print_exc()
+                        continue
+                    if result is not None:
+                        updates[pulls[pull]] = result
+
+                for serial, (signature, export) in updates.items():
+                    if export is not None:
+                        self.ingestExport(serial, export)
+                    with self.event_lock:
+                        self.exportSignatures[serial] = signature
+
+                self._devices_changed.wait(self.poll_interval)
+                self._devices_changed.clear()
             except RuntimeError as err:
                 # We have to do the funky cast to a string in order to actually get the error message.
                 # It's kinda wonky but lol python
                 if ("The remote computer refused the network connection" in str(err)):
-                    yn = input(f"ADB is not running... Please start ADB or type Y: ").strip()
+                    yn = "y" if self.headless else input(f"ADB is not running... Please start ADB or type Y: ").strip()
                     if yn.lower() == "y":
                         os.system(f"adb start-server")
                     else:
@@ -84,75 +976,120 @@ class BackgroundADBWatcher(threading.Thread):
                 traceback.print_exc()
                 time.sleep(1.5)
 
+    def _extractNewScouts(self, serial: str, export: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], str]]:
+        """Finds the scouts in a device's export that are past its watermark or have changed since the last pull."""
+        watermarks = self.deviceWatermarks.setdefault(serial, {})
+        new_scouts: List[Tuple[str, Dict[str, Any], str]] = []
+        for team, scouts in export.get('teams', {}).items():
+            watermark = watermarks.setdefault(team, { "timestamp": None, "scouts": {} })
+            previous: Dict[Any, Dict[str, Any]] = watermark["scouts"]
+            for scout in scouts:
+                timestamp = scout.get("timestamp")
+                if timestamp is not None and watermark["timestamp"] is not None and timestamp <= watermark["timestamp"] and previous.get(timestamp) == scout:
+                    # Already queued on an earlier pull, comparing against the old copy is a lot cheaper than hashing it
+                    continue
+
+                scout_digest = ScoutHashIndex.digest(scout)
+                if timestamp is None:
+                    # Nothing to order it by, so the digest stands in for the timestamp
+                    if scout_digest in previous:
+                        continue
+                    timestamp = scout_digest
+                elif watermark["timestamp"] is None or timestamp > watermark["timestamp"]:
+                    watermark["timestamp"] = timestamp
+                previous[timestamp] = scout
+                new_scouts.append((team, scout, scout_digest))
+        return new_scouts
+
+    def ingestExport(self, serial: str, export: Dict[str, Any]) -> int:
+        """Queues up the new/changed scouts from a freshly pulled export for the next send and save."""
+        with _stats.timed("extract"):
+            new_scouts = self._extractNewScouts(serial, export)
+        if len(new_scouts) <= 0:
+            return 0
+
+        _stats.increment("scouts_extracted", len(new_scouts))
+        with self.event_lock:
+            self.pendingSend.extend(new_scouts)
+            self.pendingSave.extend(new_scouts)
+            _stats.gauge("pending_send", len(self.pendingSend))
+            if any(scout_digest not in self.cachedScoutingData for _, _, scout_digest in new_scouts):
+                self.new_scouts.set()
+        return len(new_scouts)
+
+    def _updateMetricMapping(self, template: Dict[str, str]):
+        """Merges a template into the metric mapping. Entries from the template win over what's already there."""
+        self.metricMapping.update(template)
+        self.metricIdsByName = {}
+        for metric_id, metric_name in [*template.items(), *self.metricMapping.items()]:
+            # Keep the first ID for a name, the same way `list(...).index(name)` used to
+            self.metricIdsByName.setdefault(metric_name, metric_id)
+
+    def _shortenScout(self, scout: Dict[str, Any], stringify_lists: bool = False) -> Dict[str, Union[str, bool, int, float]]:
+        """Turns a raw Robot Scouter scout into a flat `{ metric_id : value }` dictionary."""
+        shortened_match_scout: Dict[str, Union[str, bool, int, float]] = {}
+        metric_count = len(scout['metrics'])
+        # We need to use the metric ID so that way it doesn't overwrite in the JSON
+        for metric_id, metric in scout['metrics'].items():
+            # Technically this is playing it risky because the metric ID isn't deterministic
+            # For now, lets use this solution, the chances of a complete overlap are very low.
+            metric_id = metric_id[:metric_count // 2]
+
+            # Force metrics with the same name to have the same metric id
+            if metric['name'] in self.metricIdsByName:
+                metric_id = self.metricIdsByName[metric['name']]
+            # Add the metric ID to the metric mapping if it's not there
+            elif metric_id not in self.metricMapping:
+                self.metricMapping[metric_id] = metric['name']
+                self.metricIdsByName[metric['name']] = metric_id
+
+            value = metric['value']
+            # Convert lists (stopwatches) to strings for better parsing (and OTA space)
+            if stringify_lists and isinstance(value, list):
+                value = ",".join([str(v) for v in value])
+
+            # Update the match scout with the metric ID to value
+            # This is mainly to remove various junk that we don't care about
+            shortened_match_scout[metric_id] = value
+        return shortened_match_scout
+
     def saveToDisk(self) -> bool:
        # Acquire the lock so that way we can make sure we merge everything properly
         with self.event_lock:
-            # { "teams": { "Team": [{"metric": "value"}], "template": { "metric_id" : "metric_name" } }
-            combinedScoutingData: Dict[str, Dict[str, Union[List[Dict[str, Union[str, bool, int, float]]], str]]] = {
-                "teams": {},
-                "template": {}
-            }
+            if self.savedScoutingData is None:
+                # { "teams": { "Team": [{"metric": "value"}], "template": { "metric_id" : "metric_name" } }
+                self.savedScoutingData = { "teams": {}, "template": {} }
+                if os.path.exists(self.saved_path):
+                    with open(self.saved_path, "r") as f:
+                        self.savedScoutingData = json.load(f)
+                    self._updateMetricMapping(self.savedScoutingData["template"])
+                self.savedIndex = ScoutHashIndex([ScoutHashIndex.digest(s) for t_s in self.savedScoutingData["teams"].values() for s in t_s])
+            combinedScoutingData = self.savedScoutingData
 
-            if os.path.exists(os.path.join(os.path.dirname(self.cache_path), "saved_scouts.json")):
-                combinedScoutingData = json.load(open(os.path.join(os.path.dirname(self.cache_path), "saved_scouts.json")))
-                self.metricMapping = combinedScoutingData["template"] # type: ignore
-
-            for idx, (device_serial, spare) in enumerate(self.perDeviceScoutingData.items()):
-                print(f"[{idx+1}] Combining Scouting Data...")
-                for team, scouts in spare['teams'].items():
-                    print(f"\t[{idx+1}] Handling Team #{team}")
-
-                    shortened_team_scout: List[Dict[str, Union[str, bool, int, float]]] = []
-                    
-                    for scout in scouts:
-                        shortened_match_scout: Dict[str, Union[str, bool, int, float]] = {}
-                        metric_count = len(list(scout['metrics'].items()))
-                        # We need to use the metric ID so that way it doesn't overwrite in the JSON
-                        for metric_id, metric in scout['metrics'].items():
-                            # Technically this is playing it risky because the metric ID isn't deterministic
-                            # For now, lets use this solution, the chances of a complete overlap are very low.
-                            metric_id = metric_id[:metric_count // 2]
-
-                            # Force metrics with the same name to have the same metric id
-                            if metric['name'] in self.metricMapping.values():
-                                metric_id = list(self.metricMapping.keys())[list(self.metricMapping.values()).index(metric['name'])]
-                            # Add the metric ID to the metric mapping if it's not there
-                            elif metric_id not in self.metricMapping.keys():
-                                self.metricMapping.update({ metric_id : metric['name']})
-                            # Update the match scout with the metric ID to value
-                            # This is mainly to remove various junk that I don't care about
-                            shortened_match_scout.update({ metric_id : metric['value'] })
-                        
-                        # We need to check the shortened match scout due to the way the file is saved
-                        scout_hash = hashlib.md5(json.dumps(shortened_match_scout).encode('ascii')).hexdigest()
-                        duplicated = False
-
-                        for t, t_s in combinedScoutingData['teams'].items():
-                            hashes = [hashlib.md5(json.dumps(s).encode('ascii')).hexdigest() for s in t_s]
-                            if scout_hash in hashes:
-                                duplicated = True
-                                break
-                        if duplicated:
-                            continue
-                        
-                        # Add the match scout to the team scout list
-                        shortened_team_scout.append(shortened_match_scout)
-                                            
-                    # If the team hasn't already been scouted by another device, *add* it to the dictionary
-                    # If the team has been scouted by another device, append to that team's scout list rather than overwriting the dictionary.
-                    if team not in combinedScoutingData['teams']:
-                        combinedScoutingData['teams'].update({team : shortened_team_scout})
-                    else:
-                        combinedScoutingData['teams'][team] += shortened_team_scout  # type: ignore
+            start = time.perf_counter()
+            print(f"Combining {len(self.pendingSave)} new scout(s)...")
+            for team, scout, _ in self.pendingSave:
+                shortened_match_scout = self._shortenScout(scout)
+                
+                # We need to check the shortened match scout due to the way the file is saved
+                if not self.savedIndex.add(ScoutHashIndex.digest(shortened_match_scout)):
+                    continue
+                
+                # If the team hasn't already been scouted by another device, *add* it to the dictionary
+                # If the team has been scouted by another device, append to that team's scout list rather than overwriting the dictionary.
+                combinedScoutingData['teams'].setdefault(team, []).append(shortened_match_scout)
+            self.pendingSave = []
             
-            combinedScoutingData['template'] = metricMapping # type: ignore
+            combinedScoutingData['template'] = self.metricMapping
+            _stats.record("save_merge", time.perf_counter() - start)
 
-            with open(os.path.join(os.path.dirname(self.cache_path), "saved_scouts.json"), "w+") as f:
+            with _stats.timed("save_write"), open(self.saved_path, "w+") as f:
                 json.dump(combinedScoutingData, f, indent=4)
 
         return True
 
-    def sendViaSerial(self) -> bool:
+    def _mergeUnsentScouts(self) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, Any], str]]]:
+        """Combines every pending scout that hasn't been sent yet, returns the combined data and the scouts it added to the cache."""
         # Acquire the lock so that way we can make sure we merge everything properly
         with self.event_lock:
             # { "teams": { "Team": [{"metric": "value"}], "template": { "metric_id" : "metric_name" } }
@@ -160,109 +1097,204 @@ class BackgroundADBWatcher(threading.Thread):
                 "teams": {},
                 "template": {}
             }
+            # Remember what got added to the cache so the scouts can be sent again if the transfer fails
+            sent_scouts: List[Tuple[str, Dict[str, Any], str]] = []
             
-            for idx, (device_serial, spare) in enumerate(self.perDeviceScoutingData.items()):
-                print(f"[{idx+1}] Combining Scouting Data...")
-                for team, scouts in spare['teams'].items():
-                    print(f"\t[{idx+1}] Handling Team #{team}")
-
-                    shortened_team_scout: List[Dict[str, Union[str, bool, int, float]]] = []
-                    
-                    for scout in scouts:
-                        scout_hash = hashlib.md5(json.dumps(scout).encode('ascii')).hexdigest()
-                        if scout_hash in self.cachedScoutingData:
-                            continue
-
-                        shortened_match_scout: Dict[str, Union[str, bool, int, float]] = {}
-                        metric_count = len(list(scout['metrics'].items()))
-                        # We need to use the metric ID so that way it doesn't overwrite in the JSON
-                        for metric_id, metric in scout['metrics'].items():
-                            # Technically this is playing it risky because the metric ID isn't deterministic
-                            # For now, lets use this solution, the chances of a complete overlap are very low.
-                            metric_id = metric_id[:metric_count // 2]
-
-                            # Force metrics with the same name to have the same metric id
-                            if metric['name'] in self.metricMapping.values():
-                                metric_id = list(self.metricMapping.keys())[list(self.metricMapping.values()).index(metric['name'])]
-                            # Add the metric ID to the metric mapping if it's not there
-                            elif metric_id not in self.metricMapping.keys():
-                                self.metricMapping.update({ metric_id : metric['name']})
-                            
-                            # Convert lists (stopwatches) to strings for better parsing (and OTA space)
-                            if isinstance(metric['value'], list):
-                                metric['value'] = ",".join([str(v) for v in metric['value']])
-
-                            # Update the match scout with the metric ID to value
-                            # This is mainly to remove various junk that we don't care about
-                            shortened_match_scout.update({ metric_id : metric['value'] })
-                        
-                        # Add the match scout to the team scout list
-                        shortened_team_scout.append(shortened_match_scout)
-                        
-                        self.cachedScoutingData.append(scout_hash)
-                    
-                    # If the team hasn't already been scouted by another device, *add* it to the dictionary
-                    # If the team has been scouted by another device, append to that team's scout list rather than overwriting the dictionary.
-                    if team not in combinedScoutingData['teams']:
-                        combinedScoutingData['teams'].update({team : shortened_team_scout})
-                    else:
-                        combinedScoutingData['teams'][team] += shortened_team_scout  # type: ignore
+            start = time.perf_counter()
+            print(f"Combining {len(self.pendingSend)} new scout(s)...")
+            for team, scout, scout_hash in self.pendingSend:
+                # Another device could have had the same scout, or it went out before a restart
+                if not self.cachedScoutingData.add(scout_hash):
+                    continue
+                sent_scouts.append((team, scout, scout_hash))
+
+                # If the team hasn't already been scouted by another device, *add* it to the dictionary
+                # If the team has been scouted by another device, append to that team's scout list rather than overwriting the dictionary.
+                combinedScoutingData['teams'].setdefault(team, []).append(self._shortenScout(scout, stringify_lists=True)) # type: ignore
+            self.pendingSend = []
             
             combinedScoutingData['template'] = self.metricMapping # type: ignore
+            _stats.record("send_merge", time.perf_counter() - start)
+        _stats.increment("scouts_merged", len(sent_scouts))
+        return combinedScoutingData, sent_scouts
 
-        # Do this once we release the lock so the wipe method can actually wipe
-        self.wipe()
+    def sendViaSerial(self) -> bool:
+        """Sends every unsent scout. If a digest goes out first this returns once the digest has been acknowledged, the
+        full scouts keep going in the background (and go back to being unsent if they never make it)."""
+        with _stats.timed("send"):
+            sent = self._sendViaSerial()
+        _stats.increment("sends_acknowledged" if sent else "sends_failed")
+        return sent
 
-        if len(combinedScoutingData['template']) == 0 or all([len(match_scouts) == 0 for team, match_scouts in combinedScoutingData['teams'].items()]):
-            print(f"No new data received since last clear... Skipping data send...")
-            return True
+    def _sendViaSerial(self) -> bool:
+        with self.send_lock:
+            combinedScoutingData, sent_scouts = self._mergeUnsentScouts()
 
-        for team, match_scouts in list(combinedScoutingData['teams'].items()):
-            if len(match_scouts) <= 0:
-                combinedScoutingData['teams'].pop(team)
+            if len(combinedScoutingData['template']) == 0 or all([len(match_scouts) == 0 for team, match_scouts in combinedScoutingData['teams'].items()]):
+                print(f"No new data received since last clear... Skipping data send...")
+                return True
 
-        print(f"Finding LoRa serial device...")
-        # Now we need to send the JSON data to the serial device connected (LoRa Sender).
-        ports = []
+            for team, match_scouts in list(combinedScoutingData['teams'].items()):
+                if len(match_scouts) <= 0:
+                    combinedScoutingData['teams'].pop(team)
 
-        while ports is None or len(ports) <= 0:
-            ports = list(serial.tools.list_ports.comports())
-            for idx, port in enumerate(ports):
-                # Make sure to ignore Android/SAMSUNG devices... 
-                if "Feather 32u4" not in str(port):
-                    ports.pop(idx)
-        ports = sorted(ports, key=lambda p: str(p))
-        port = ports[0]
-
-        print(f"Detected serial device on port: '{port}'...")
-        serial_device = serial.Serial(port[0], 9600, timeout=15.0)
-        
-        # The separators argument makes sure that the final output JSON is ideally very slim
-        # (aka it strips off extra whitespace on lists and key/value pairs).
-        json_dump = json.dumps(combinedScoutingData, separators=(',', ':'))
-        
-        packet = json_dump.encode('utf-8').strip(b"\x00") + _SCOUTING_EOF
-        
-        print(f"Packet Size: {len(packet)}")
-
-        step = 128
-        for i in range(0, len(packet), step):
-            print(f"\t[{i // step}] Sending split serial packet...")
-            serial_device.write(packet[i:i+step])
-            serial_device.read_until(_SCOUTING_EOF)
-        print(f"Serial data sent...")        
+            payload = self._buildPayload(combinedScoutingData)
+            
+            self.transfer_id = (self.transfer_id + 1) & 0xFFFF
+            details_transfer_id = self.transfer_id
+            frames = _buildDataFrames(payload, self.station_id, details_transfer_id)
+            
+            print(f"Payload Size: {len(payload)} :: Frames: {len(frames)}")
+            _stats.gauge("last_send.scouts", len(sent_scouts))
+            _stats.gauge("last_send.frames", len(frames))
+            _stats.gauge("last_send.wire_bytes", sum(len(frame) for frame in frames))
+
+            started = time.perf_counter()
+            fingerprint = templateFingerprint(combinedScoutingData['template'])
+            digest_payload = b""
+            if self.digests:
+                with self.event_lock:
+                    superseded = list(self.superseded_transfers)
+                digest_payload = self._buildDigestPayload(combinedScoutingData, details_transfer_id, fingerprint, superseded)
+                if len(digest_payload) > len(payload) * _DIGEST_MAX_RATIO:
+                    print(f"Digest Size: {len(digest_payload)} :: Not worth sending ahead of the full scouts...")
+                    _stats.increment("digests_skipped")
+                    digest_payload = b""
+
+            if len(digest_payload) <= 0:
+                transmitted = self.transport.sendFrames(frames, self.station_id, details_transfer_id)
+                self._finishDetails(transmitted, sent_scouts, details_transfer_id, fingerprint, started)
+                return transmitted
+
+            # The digest gets queued first (and at a higher priority), the full scouts follow right behind it
+            self.transfer_id = (self.transfer_id + 1) & 0xFFFF
+            digest_transfer_id = self.transfer_id
+            digest_frames = _buildDataFrames(digest_payload, self.station_id, digest_transfer_id)
+            print(f"Digest Size: {len(digest_payload)} :: Frames: {len(digest_frames)}")
+            _stats.gauge("last_send.digest_frames", len(digest_frames))
+            digest = self.transport.submit(digest_frames, self.station_id, digest_transfer_id, _PRIORITY_DIGEST)
+            details = self.transport.submit(frames, self.station_id, details_transfer_id, _PRIORITY_DETAILS)
+            details.add_done_callback(lambda future: self._finishDetails(future.exception() is None and future.result(), sent_scouts, details_transfer_id, fingerprint, started))
+
+        with _stats.timed("transmit_digest"):
+            acknowledged = digest.result()
+        if not acknowledged:
+            print(f"Receiver never acknowledged the digest... The full scouts are still being sent!")
+            return False
+        self.digest_fingerprint = fingerprint
+        with self.event_lock:
+            # The receiver has dropped these now, anything that failed since (or another send's) goes in the next digest
+            self.superseded_transfers = [transfer_id for transfer_id in self.superseded_transfers if transfer_id not in superseded]
+            self._writeCache()
+        print(f"Digest acknowledged, the full scouts are still being sent in the background...")
+        return True
+
+    def _buildDigestPayload(self, combinedScoutingData: Dict[str, Any], details_transfer_id: int, fingerprint: int, superseded: List[int]) -> bytes:
+        with _stats.timed("digest"):
+            payload = encodeDigest(buildDigest(combinedScoutingData), combinedScoutingData['template'], details_transfer_id, superseded, include_template=fingerprint != self.digest_fingerprint)
+            compressed_payload = compressPayload(payload, self.dictionary)
+            if len(compressed_payload) < len(payload):
+                payload = compressed_payload
+        _stats.gauge("last_send.digest_bytes", len(payload))
+        return payload
+
+    def _finishDetails(self, transmitted: bool, sent_scouts: List[Tuple[str, Dict[str, Any], str]], transfer_id: int, fingerprint: int, started: float):
+        """Caches the scouts once the full scouts have been acknowledged, or puts them back to be sent again."""
+        _stats.record("transmit", time.perf_counter() - started)
+        _stats.increment("details_acknowledged" if transmitted else "details_failed")
+        if not transmitted:
+            print(f"Receiver never acknowledged the transfer... Data will need to be sent again!")
+            with self.event_lock:
+                for _, _, scout_hash in sent_scouts:
+                    self.cachedScoutingData.discard(scout_hash)
+                # Put them back at the front of the queue for the next send
+                self.pendingSend[:0] = sent_scouts
+                self.superseded_transfers = [*self.superseded_transfers, transfer_id][-_MAX_SUPERSEDED:]
+                self._writeCache()
+            # Let the auto sender know there's something to send again
+            self.new_scouts.set()
+            return
+        print(f"Serial data sent...")
+        # The full scouts have the template in them, so digests don't need to send it anymore
+        self.digest_fingerprint = fingerprint
+        with self.event_lock:
+            self._writeCache()
+
+    def _writeCache(self):
+        """Writes out scouting_cache.json, `event_lock` has to be held."""
         with open(self.cache_path, "w+") as f:
             json.dump({
-                'cache': self.cachedScoutingData,
-                'template': self.metricMapping
+                'cache': self.cachedScoutingData.toList(),
+                'template': self.metricMapping,
+                'superseded': self.superseded_transfers,
             }, f, indent=4)
 
+    def _buildPayload(self, combinedScoutingData: Dict[str, Any]) -> bytes:
+        """Encodes the combined data and compresses it if that actually makes it smaller."""
+        if self.encoding != "json":
+            # Only for the stats, so there's something to compare the encoded size against
+            _stats.gauge("last_send.json_bytes", len(json.dumps(combinedScoutingData, separators=(',', ':'))))
+        with _stats.timed("encode"):
+            payload = self._encodePayload(combinedScoutingData)
+        with _stats.timed("compress"):
+            compressed_payload = compressPayload(payload, self.dictionary)
+        if self.encoding == "json":
+            _stats.gauge("last_send.json_bytes", len(payload))
+        _stats.gauge("last_send.encoded_bytes", len(payload))
+        _stats.gauge("last_send.compressed_bytes", len(compressed_payload))
+        _stats.increment("payload_bytes_encoded", len(payload))
+        if len(compressed_payload) < len(payload):
+            print(f"Compressed payload from {len(payload)} to {len(compressed_payload)} bytes")
+            return compressed_payload
+        return payload
+
+    def _encodePayload(self, combinedScoutingData: Dict[str, Any]) -> bytes:
+        if self.encoding == "binary":
+            return encodeScoutingData(combinedScoutingData)
+        # The separators argument makes sure that the final output JSON is ideally very slim
+        # (aka it strips off extra whitespace on lists and key/value pairs).
+        return json.dumps(combinedScoutingData, separators=(',', ':')).encode('utf-8')
+
+    def trainDictionary(self) -> bool:
+        """Trains the compression dictionary from saved/combined scouting history, it has to be copied over to the receiver."""
+        history_paths = [os.path.join(os.path.dirname(self.cache_path), "saved_scouts.json"), *self.training_paths]
+
+        samples: List[bytes] = []
+        for path in history_paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as f:
+                history = json.load(f)
+            print(f"Loading scouting history from {path}...")
+            # Each sample looks like a single match update, since that's what usually ends up getting sent
+            for team, scouts in history['teams'].items():
+                for scout in scouts:
+                    samples.append(self._encodePayload({ "teams": { team: [scout] }, "template": history['template'] }))
+
+        if len(samples) <= 0:
+            print(f"No scouting history found to train the dictionary with...")
+            return False
+
+        dictionary = trainDictionary(samples)
+        with open(self.dictionary_path, "wb+") as f:
+            f.write(dictionary)
+        self.dictionary = dictionary
+
+        raw_size = sum(len(sample) for sample in samples)
+        compressed_size = sum(len(compressPayload(sample, dictionary)) for sample in samples)
+        print(f"Trained dictionary #{dictionaryId(dictionary):08x} ({len(dictionary)} bytes) from {len(samples)} scouts")
+        print(f"Average match update: {raw_size // len(samples)} -> {compressed_size // len(samples)} bytes")
+        print(f"Copy '{self.dictionary_path}' over to the receiver and pass it with --dictionary, it won't acknowledge any sends until then")
         return True
 
     def wipe(self) -> bool:
         # Acquire the lock so it gets deleted properly
         with self.event_lock:
-            self.perDeviceScoutingData = {}
+            # Forget what's been pulled so every export gets pulled (and every scout gets queued) again
+            self.exportSignatures = {}
+            self.deviceWatermarks = {}
+            self.pendingSend = []
+            self.pendingSave = []
             time.sleep(0.5)
         return True
 
@@ -270,25 +1302,197 @@ class BackgroundADBWatcher(threading.Thread):
         # Once again, grab the event lock so that way we can safely delete the cache
         with self.event_lock:
             self.cachedScoutingData.clear()
-            with open(self.cache_path, "w+") as f:
-                json.dump({
-                    'cache': self.cachedScoutingData,
-                    'template': self.metricMapping
-                }, f, indent=4)
+            # Everything still on the devices has to be sent again, so they all need to be pulled (and queued) again
+            self.exportSignatures = {}
+            self.deviceWatermarks = {}
+            self._writeCache()
         return True
 
     def stop(self):
         self._stop_event.set()
+        self._devices_changed.set()
+        self.pull_pool.shutdown(wait=False)
+        # No `send_lock` here, a send can be stuck waiting on radios that aren't plugged in and closing is what stops it
+        self.transport.close()
 
     def stopped(self):
         return self._stop_event.is_set()
 
+class AutoSender(threading.Thread):
+    """Sends new scouts on its own, batching them up for a bit and keeping under an airtime budget.
+
+    The budget is a token bucket of airtime seconds: it holds up to `airtime_budget` seconds and refills at
+    `airtime_budget / budget_period` seconds per second. A send is only started once the bucket isn't empty, and the
+    airtime that actually gets used (resends included) is taken out of the bucket as it goes. The full scouts can still
+    be sending after `sendViaSerial` returns, so their airtime gets taken out whenever the bucket is refilled.
+    """
+
+    def __init__(self, watcher: BackgroundADBWatcher, batch_window: float = 5.0, airtime_budget: float = 60.0, budget_period: float = 600.0, retry_delay: float = 15.0):
+        super().__init__(daemon=True)
+        self.watcher = watcher
+        self.batch_window = batch_window
+        self.airtime_budget = airtime_budget
+        self.refill_rate = airtime_budget / budget_period
+        self.retry_delay = retry_delay
+
+        self.tokens = airtime_budget
+        self.refilled = time.monotonic()
+        # The transport's airtime total the last time the bucket was charged
+        self.airtime_charged = watcher.transport.airtime_used
+        self._stop_event = threading.Event()
+
+    def _refill(self):
+        now = time.monotonic()
+        airtime_used = self.watcher.transport.airtime_used
+        self.tokens = min(self.airtime_budget, self.tokens + (now - self.refilled) * self.refill_rate) - max(0.0, airtime_used - self.airtime_charged)
+        self.refilled = now
+        self.airtime_charged = airtime_used
+        _stats.gauge("airtime_budget_seconds", round(self.tokens, 3))
+
+    def run(self):
+        while not self.stopped():
+            self.watcher.new_scouts.wait(1.0)
+            if not self.watcher.new_scouts.is_set():
+                continue
+
+            # Give the other scouters a moment to sync so a whole match goes out in one transfer
+            if self._stop_event.wait(self.batch_window):
+                break
+
+            self._refill()
+            if self.tokens <= 0:
+                wait = -self.tokens / self.refill_rate
+                print(f"Airtime budget used up, holding the next send for {wait:.1f}s...")
+                _stats.increment("auto_sends_throttled")
+                if self._stop_event.wait(wait):
+                    break
+                self._refill()
+
+            self.watcher.new_scouts.clear()
+            try:
+                sent = self.watcher.sendViaSerial()
+            except Exception:
+                traceback.print_exc()
+                sent = False
+            self._refill()
+            _stats.increment("auto_sends")
+
+            if not sent:
+                # The scouts went back to being unsent, so try again in a bit
+                self.watcher.new_scouts.set()
+                self._stop_event.wait(self.retry_delay)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stopped(self):
+        return self._stop_event.is_set()
+
+class ControlRequestHandler(http.server.BaseHTTPRequestHandler):
+    """`POST /send`, `/save`, `/wipe`, `/clear`, `/train-dictionary` and `GET /stats`, the same things the prompt does.
+
+    Requests need the `X-Radio-Scouter` header and have to be addressed to localhost (which stops DNS rebinding).
+    """
+
+    def _respond(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, indent=4).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if self.headers.get(_CONTROL_HEADER) is None or host not in ("127.0.0.1", "localhost"):
+            self._respond(403, { "error": f"Requests need the {_CONTROL_HEADER} header and have to be sent to localhost" })
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/stats":
+            self._respond(200, _stats.snapshot())
+        else:
+            self._respond(404, { "error": f"Unknown endpoint: {self.path}" })
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        watcher: BackgroundADBWatcher = self.server.watcher # type: ignore
+        commands = {
+            "/send": watcher.sendViaSerial,
+            "/save": watcher.saveToDisk,
+            "/wipe": watcher.wipe,
+            "/clear": watcher.clear,
+            "/train-dictionary": watcher.trainDictionary,
+        }
+        if self.path not in commands:
+            self._respond(404, { "error": f"Unknown command: {self.path}" })
+            return
+        try:
+            self._respond(200, { "ok": commands[self.path]() })
+        except Exception as err:
+            traceback.print_exc()
+            self._respond(500, { "ok": False, "error": str(err) })
+
+    def log_message(self, format: str, *args: Any):
+        # Don't spam the prompt with every request
+        pass
+
+def startControlServer(watcher: BackgroundADBWatcher, port: int) -> Optional[http.server.ThreadingHTTPServer]:
+    """Serves the control API on localhost only, nothing else should be able to trigger sends."""
+    try:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), ControlRequestHandler)
+    except OSError as err:
+        # Most likely another sender already has the port, everything else still works without the API
+        print(f"Unable to start the control API on port {port} ({err})... Carrying on without it")
+        return None
+    server.watcher = watcher # type: ignore
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Control API listening on http://127.0.0.1:{server.server_address[1]}")
+    return server
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", type=str, default="127.0.0.1")
     parser.add_argument("--port", type=int, default=5037)
     parser.add_argument("--debug", action="store_true", default=False)
     parser.add_argument("--device-path", type=str, default="/storage/emulated/0/Download/Robot Scouter/RadioScout.json")
+    parser.add_argument("--encoding", type=str, choices=["json", "binary"], default="json")
+    parser.add_argument("--dictionary", type=str, default="./scouting_dictionary.bin")
+    # Extra history (like the receiver's combined_scouts.json) to train the dictionary with
+    parser.add_argument("--training-data", type=str, nargs="*", default=[])
+    # How often connected devices get checked for a changed export
+    parser.add_argument("--poll-interval", type=float, default=1.5)
+    parser.add_argument("--pull-workers", type=int, default=8)
+    # Defaults to finding every Feather 32u4 on its own, pass it more than once to use more than one radio
+    parser.add_argument("--serial-port", type=str, action="append", default=[])
+    # Only matters for USB-serial adapters, the Feather's native USB runs at full speed no matter what this is
+    parser.add_argument("--baud", type=int, default=9600)
+    # Frames allowed to be waiting on the LoRa sender at once (it only has ~2.5KB of RAM)
+    parser.add_argument("--window", type=int, default=4)
+    # Has to be different for every scouting station sharing a channel, defaults to one based on the hostname
+    parser.add_argument("--station-id", type=lambda value: int(value, 0), default=None)
+    # Sends wait on the whole transfer instead of sending a per-team digest first and the full scouts in the background
+    parser.add_argument("--no-digests", action="store_true", default=False)
+    # Stage timings/counters get written here every so often (same thing the `stats` command shows)
+    parser.add_argument("--metrics-file", type=str, default="./sender_metrics.json")
+    parser.add_argument("--metrics-interval", type=float, default=10.0)
+
+    # Runs without the prompt, new scouts get sent on their own (see `AutoSender`)
+    parser.add_argument("--headless", action="store_true", default=False)
+    parser.add_argument("--auto-send", action="store_true", default=False, help="Send new scouts on their own while still showing the prompt")
+    # How long to wait for more scouts to show up before sending them
+    parser.add_argument("--batch-window", type=float, default=5.0)
+    # Seconds of airtime allowed per --budget-period, anything past that waits (10% duty cycle by default)
+    parser.add_argument("--airtime-budget", type=float, default=60.0)
+    parser.add_argument("--budget-period", type=float, default=600.0)
+    parser.add_argument("--spreading-factor", type=int, default=7, help="Has to match Sender.ino, only used for the airtime budget")
+    # Local HTTP API for send/save/wipe/clear/stats, on 3284 by default with --headless/--auto-send (0 turns it off)
+    parser.add_argument("--control-port", type=int, default=None)
 
     args = parser.parse_args()
 
@@ -306,17 +1510,40 @@ def main():
         # We have to do the funky cast to a string in order to actually get the error message.
         # It's kinda wonky but lol python
         if ("The remote computer refused the network connection" in str(err)):
-            yn = input(f"ADB is not running... Please start ADB or type Y: ").strip()
-            if yn.lower() == "y":
+            if args.headless:
+                print(f"ADB is not running... Starting it...")
                 os.system(f"adb start-server")
             else:
-                return
+                yn = input(f"ADB is not running... Please start ADB or type Y: ").strip()
+                if yn.lower() == "y":
+                    os.system(f"adb start-server")
+                else:
+                    return
     
     # Start the background task that repeatedly monitors all devices attached.
-    backgroundWatcher: BackgroundADBWatcher = BackgroundADBWatcher(client=client, export_path=args.device_path)
+    backgroundWatcher: BackgroundADBWatcher = BackgroundADBWatcher(client=client, export_path=args.device_path, encoding=args.encoding, dictionary_path=args.dictionary, training_paths=args.training_data, poll_interval=args.poll_interval, pull_workers=args.pull_workers, serial_ports=args.serial_port, spreading_factor=args.spreading_factor, headless=args.headless, baud=args.baud, window=args.window, station_id=args.station_id, digests=not args.no_digests)
+    # Started before anything else so a port that's already taken can't leave the watcher running with no prompt
+    controlPort = args.control_port if args.control_port is not None else (3284 if args.headless or args.auto_send else 0)
+    controlServer = startControlServer(backgroundWatcher, controlPort) if controlPort > 0 else None
     backgroundWatcher.start()
-    
-    command: str = input(_ARGUMENTS_PROMPT).lower()
+    if args.metrics_file:
+        _stats.startWriting(args.metrics_file, args.metrics_interval)
+
+    autoSender: Optional[AutoSender] = None
+    if args.headless or args.auto_send:
+        autoSender = AutoSender(backgroundWatcher, batch_window=args.batch_window, airtime_budget=args.airtime_budget, budget_period=args.budget_period)
+        autoSender.start()
+
+    if args.headless:
+        print(f"Running headless, press Ctrl+C to stop...")
+        try:
+            while backgroundWatcher.is_alive():
+                backgroundWatcher.join(timeout=1)
+        except KeyboardInterrupt:
+            pass
+        command = "exit"
+    else:
+        command = input(_ARGUMENTS_PROMPT).lower()
 
     while command != "exit":
         if command == "send":
@@ -327,6 +1554,10 @@ def main():
             backgroundWatcher.wipe()
         elif command == "clear":
             backgroundWatcher.clear()
+        elif command == "train-dictionary":
+            backgroundWatcher.trainDictionary()
+        elif command == "stats":
+            print(json.dumps(_stats.snapshot(), indent=4))
         else:
             print(f"Unknown command... Please try again")
             time.sleep(0.25)
@@ -334,9 +1565,16 @@ def main():
         command = input(_ARGUMENTS_PROMPT).lower()
 
 
+    if controlServer is not None:
+        controlServer.shutdown()
+    if autoSender is not None:
+        autoSender.stop()
+        autoSender.join(timeout=5)
+
     print(f"Stopping background watcher thread...")
     backgroundWatcher.stop()
     backgroundWatcher.join(timeout=5)
+    _stats.stopWriting()
 
 if __name__ == "__main__":
     # We need to run the main thread asynchronously so that way we can poll each device on the USB bus individually.